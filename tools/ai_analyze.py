@@ -10,6 +10,200 @@ import sys
 import json
 import os
 import re
+import time
+
+GROQ_TIMEOUT = 30  # seconds per completion request
+STREAM_STOP_SHARE = 0.9  # under a deadline, stop reading here and keep what has completed
+
+# ── STREAMED JSON ────────────────────────────────────────
+
+_FENCE = re.compile(r'^\s*```(?:json)?\s*$', re.MULTILINE)
+
+def strip_fences(text: str) -> str:
+    return _FENCE.sub('', text).strip()
+
+class StreamScanner:
+    """
+    Incremental scanner over a streamed JSON object. Tracks nesting and string state one
+    character at a time (each character is visited once), and reports top-level string
+    fields and each item of the 'aiRecommendations' array the moment they are complete.
+    Text before the opening brace (markdown fences, prose) is skipped.
+    """
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.text = ''
+        self.fields = {}
+        self.recommendations = []
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key = None
+        self._string_start = None
+        self._value_start = None
+        self._item_start = None
+
+    def _emit(self, kind: str, value) -> None:
+        if self.on_event:
+            self.on_event(kind, value)
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            depth = len(self._stack)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1], strict=False)
+                    elif depth == 1 and self._value_start == self._string_start:
+                        self.fields[self._key] = json.loads(text[self._value_start:i + 1], strict=False)
+                        self._emit(self._key, self.fields[self._key])
+                        self._value_start = None
+                continue
+            if not self._stack and ch != '{':
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            elif ch in '{[':
+                if depth == 1 and self._value_start is None:
+                    self._value_start = i
+                if depth == 2 and ch == '{' and self._stack[1] == '[' and self._key == 'aiRecommendations':
+                    self._item_start = i
+                self._stack.append(ch)
+                if not depth:
+                    self._expect_key = True
+            elif ch in '}]':
+                self._stack.pop()
+                depth -= 1
+                if depth == 2 and ch == '}' and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:i + 1], strict=False)
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        self.recommendations.append(item)
+                        self._emit('aiRecommendation', item)
+                    self._item_start = None
+                elif depth == 1:
+                    self._value_start = None
+            elif depth == 1 and ch == ':':
+                self._expect_key = False
+            elif depth == 1 and ch == ',':
+                self._expect_key = True
+                self._value_start = None
+        self._pos = len(text)
+
+    def partial(self) -> dict:
+        """Whatever completed before the stream broke off."""
+        return dict(self.fields, aiRecommendations=list(self.recommendations))
+
+def _finish_scalar(out: list, in_object: bool, key_start: int | None) -> None:
+    """Complete a literal or number cut off at the end of `out` ('tru' → 'true', '12.' → '12'), else drop it."""
+    i = len(out)
+    while i and out[i - 1] not in ' \t\r\n,:[]{}"':
+        i -= 1
+    token = ''.join(out[i:])
+    if not token:
+        return
+    literal = next((w for w in ('true', 'false', 'null') if w.startswith(token)), None)
+    number = token.rstrip('.eE+-')
+    if literal:
+        out[i:] = literal
+    elif number and number != '-':
+        out[i:] = number
+    elif in_object and key_start is not None:
+        del out[key_start:]  # nothing left of the value: drop its key too
+    else:
+        del out[i:]
+
+def repair_json(text: str) -> tuple[object, bool]:
+    """
+    Best-effort fix for the ways LLM JSON goes wrong: markdown fences, prose around the
+    object, trailing commas, and output cut off mid-string, mid-literal or mid-object (open
+    strings and brackets are closed, cut literals completed, a dangling key is dropped).
+    Returns (value, cut): cut is True when the text ended inside the object, so its last
+    item may be incomplete. Raises JSONDecodeError if that is not enough.
+    """
+    text = strip_fences(text)
+    start = text.find('{')
+    if start < 0:
+        raise json.JSONDecodeError('No JSON object found', text, 0)
+    out, stack = [], []
+    in_string = escape = expect_key = False
+    dangling = None  # where an object key with no value yet starts in `out`
+    key_start = None  # where the latest object key starts in `out`
+
+    def drop_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ',':
+            out.pop()
+
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch.isspace():
+            out.append(ch)
+            continue
+        if ch == ':':
+            out.append(ch)
+            expect_key = False
+            continue
+        if dangling is not None and not expect_key:
+            dangling = None  # the key's value has started
+        if ch == '"':
+            if stack and stack[-1] == '}' and expect_key:
+                dangling = key_start = len(out)
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            expect_key = ch == '{'
+        elif ch in '}]':
+            drop_trailing_comma()
+            if not stack:
+                break
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break  # anything after the root object is prose
+            continue
+        elif ch == ',':
+            expect_key = stack[-1] == '}' if stack else False
+        out.append(ch)
+
+    cut = bool(stack)
+    if cut:
+        if dangling is not None:
+            del out[dangling:]
+            in_string = escape = False
+        if escape:
+            out.pop()
+        if in_string:
+            out.append('"')
+        else:
+            _finish_scalar(out, stack[-1] == '}', key_start)
+        drop_trailing_comma()
+        out.extend(reversed(stack))
+    return json.loads(''.join(out), strict=False), cut
 
 def generate_mermaid_diagram(tech: dict, seo: dict) -> str:
     framework = tech.get('framework', 'Unknown')
@@ -42,7 +236,13 @@ def generate_mermaid_diagram(tech: dict, seo: dict) -> str:
 
     return '\n'.join(lines)
 
-def analyze(seo: dict, tech: dict, competitive: dict, url: str) -> dict:
+def analyze(seo: dict, tech: dict, competitive: dict, url: str, timeout: float | None = None,
+            on_event=None) -> dict:
+    """
+    Stream the completion and parse it as it arrives. `on_event(kind, value)` is called with
+    ('aiSummary', str), ('competitiveSummary', str) and ('aiRecommendation', dict) as soon as
+    each value is complete, so callers can show recommendations before the response ends.
+    """
     api_key = os.environ.get('GROQ_API_KEY')
     if not api_key:
         return {
@@ -93,47 +293,70 @@ RULES:
 
     try:
         from groq import Groq
-        client = Groq(api_key=api_key)
-        
-        response = client.chat.completions.create(
+        started = time.monotonic()
+        deadline = started + (timeout * STREAM_STOP_SHARE if timeout else GROQ_TIMEOUT)
+        # Under a pipeline deadline the SDK's own retries would overrun the stage budget
+        client = Groq(api_key=api_key, timeout=timeout or GROQ_TIMEOUT, max_retries=0 if timeout else 2)
+        first_rec_ms = None
+
+        def emit(kind, value):
+            nonlocal first_rec_ms
+            if kind == 'aiRecommendation' and first_rec_ms is None:
+                first_rec_ms = int((time.monotonic() - started) * 1000)
+            if on_event:
+                on_event(kind, value)
+
+        scanner = StreamScanner(emit)
+        truncated, finish_reason = False, None
+        stream = client.chat.completions.create(
             model='llama-3.3-70b-versatile',
             messages=[
                 {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': user_prompt}
             ],
             temperature=0.1,
-            max_tokens=3000
+            max_tokens=3000,
+            stream=True
         )
-        
-        raw_text = response.choices[0].message.content.strip()
-        
-        # Strip markdown fences if present
-        raw_text = re.sub(r'^```json\n?', '', raw_text, flags=re.MULTILINE)
-        raw_text = re.sub(r'\n?```$', '', raw_text, flags=re.MULTILINE)
-        
-        result = json.loads(raw_text)
-        result['architectureDiagram'] = generate_mermaid_diagram(tech, seo)
-        return result
+        try:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    scanner.feed(delta)
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if time.monotonic() > deadline:
+                    truncated = True
+                    break
+        finally:
+            stream.close()
 
-    except json.JSONDecodeError:
-        # Retry with explicit instruction
+        # Malformed or cut-off output is repaired here rather than paying for a second call
+        repaired, cut = False, truncated or finish_reason != 'stop'
         try:
-            retry = client.chat.completions.create(
-                model='llama-3.3-70b-versatile',
-                messages=[
-                    {'role': 'system', 'content': system_prompt},
-                    {'role': 'user', 'content': user_prompt},
-                    {'role': 'assistant', 'content': raw_text},
-                    {'role': 'user', 'content': 'Your response was not valid JSON. Return ONLY the JSON object, no other text.'}
-                ],
-                temperature=0.1,
-                max_tokens=3000
-            )
-            result = json.loads(retry.choices[0].message.content.strip())
-            result['architectureDiagram'] = generate_mermaid_diagram(tech, seo)
-            return result
-        except Exception as e:
-            pass
+            result = json.loads(strip_fences(scanner.text), strict=False)
+        except json.JSONDecodeError:
+            repaired = True
+            try:
+                result, closed = repair_json(scanner.text)
+                cut = cut or closed
+            except json.JSONDecodeError:
+                result = scanner.partial()
+        if not isinstance(result, dict) or not (result.get('aiSummary') or result.get('aiRecommendations')):
+            raise ValueError('Completion held no usable analysis')
+        # Repair can make a half-written recommendation parse: after a cut, keep only the
+        # items the scanner saw close
+        recs = scanner.recommendations if cut else result.get('aiRecommendations') or []
+        result['aiRecommendations'] = [r for r in recs if isinstance(r, dict) and r.get('issue') and r.get('fix')]
+        result['architectureDiagram'] = generate_mermaid_diagram(tech, seo)
+        result['stream'] = {
+            'firstRecommendationMs': first_rec_ms,
+            'totalMs': int((time.monotonic() - started) * 1000),
+            'repaired': repaired,
+            'truncated': truncated,
+            'finishReason': finish_reason,
+        }
+        return result
 
     except Exception as e:
         print(f"ERROR: AI analysis failed: {e}")
@@ -156,5 +379,11 @@ if __name__ == '__main__':
     with open(sys.argv[3]) as f: comp = json.load(f)
     url = sys.argv[4] if len(sys.argv) > 4 else 'unknown'
 
-    result = analyze(seo, tech, comp, url)
+    def show(kind, value):
+        if kind == 'aiRecommendation':
+            print(f"INFO: [{value.get('priority')}] {value.get('issue')}")
+        else:
+            print(f"INFO: {kind}: {value}")
+
+    result = analyze(seo, tech, comp, url, on_event=show)
     print(json.dumps(result, indent=2))
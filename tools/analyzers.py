@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tool: analyzers.py
+Purpose: Registry of pipeline stages — declared inputs/outputs, lazy imports, selective execution
+Layer: B.L.A.S.T. Navigation Layer
+"""
+
+import importlib
+
+# Each analyzer reads named values from the pipeline context and writes exactly one
+# named value back. `inputs` are passed positionally in the order declared here.
+# `options` are optional context values passed as keyword arguments when set.
+# `reusable` outputs depend only on page content, so near-duplicate pages may reuse them.
+# `cost` is the stage's relative share of a pipeline deadline; stages that take a
+# `timeout` option receive their budget in seconds and stop their own network calls early.
+# Optional analyzers (default False) only run when asked for; if they declare a
+# `section`, their output is copied into the result under that key; if they declare
+# `merge` (a result key and a field name), their output is folded into that existing
+# section instead: lists the section has (issues, adNetworks...) are extended, other
+# keys it has are replaced, and the rest is nested under the field name.
+# Modules are only imported when a stage actually runs, so heavy or paid
+# dependencies (Playwright, groq, SimilarWeb) are never touched by narrow jobs.
+ANALYZERS = {
+    'scrape': {
+        'module': 'scrape_url', 'func': 'run',
+        'inputs': ('url',), 'options': ('throttle', 'refresh', 'timeout'), 'output': 'raw',
+        'label': '🔍 Fetching & scraping URL...',
+        'cost': 50,
+        'default': True,
+    },
+    'tech': {
+        'module': 'detect_tech', 'func': 'detect',
+        'inputs': ('raw',), 'output': 'tech',
+        'label': '🛠️  Detecting tech stack...',
+        'summary': lambda t: f"Framework: {t['framework']} | CMS: {t['cms']} | Confidence: {t['confidence']}%",
+        'reusable': True,
+        'cost': 2,
+        'default': True,
+    },
+    'seo': {
+        'module': 'seo_audit', 'func': 'audit',
+        'inputs': ('raw',), 'output': 'seo',
+        'label': '📊 Running SEO audit...',
+        'summary': lambda s: f"Score: {s['score']}/100 (Grade: {s['grade']}) | Issues: {len(s['issues'])}",
+        'reusable': True,
+        'cost': 3,
+        'default': True,
+    },
+    'competitive': {
+        'module': 'detect_competitive', 'func': 'detect',
+        'inputs': ('raw',), 'options': ('timeout',), 'output': 'competitive',
+        'label': '📢 Checking for ads & tracking...',
+        'summary': lambda c: f"Ads running: {c['adsRunning']} | Networks: {len(c['adNetworks'])}",
+        'reusable': True,
+        'cost': 5,
+        'default': True,
+    },
+    'ai': {
+        'module': 'ai_analyze', 'func': 'analyze',
+        'inputs': ('seo', 'tech', 'competitive', 'url'), 'options': ('timeout', 'on_event'), 'output': 'ai',
+        'label': '🤖 Running AI analysis...',
+        'summary': lambda a: (f"⚠️  AI: {a['error']}" if a.get('error')
+                              else f"{len(a.get('aiRecommendations', []))} recommendations generated"),
+        'reusable': True,
+        'cost': 30,
+        'default': True,
+    },
+    'performance': {
+        'module': 'perf_metrics', 'func': 'score',
+        'inputs': ('raw',), 'output': 'performance', 'section': 'performance',
+        'label': '⏱️  Scoring rendering performance...',
+        'summary': lambda p: (f"Score: {p['score']}/100 (Grade: {p['grade']}) | LCP: {p['metrics']['lcpMs']['value']} ms"
+                              if p['available'] else p['reason']),
+        'cost': 1,
+        'default': True,
+    },
+    'weight': {
+        'module': 'page_weight', 'func': 'audit',
+        'inputs': ('raw',), 'options': ('timeout',), 'output': 'pageWeight', 'section': 'pageWeight',
+        'label': '⚖️  Sizing scripts, stylesheets & images...',
+        'summary': lambda w: (f"Total: {w['totalBytes'] // 1024} KB across {w['assetCount']} assets | "
+                              f"Third-party: {w['thirdParty']['share']}%"),
+        'cost': 15,
+        'default': False,
+    },
+    'benchmark': {
+        'module': 'cohort', 'func': 'compare',
+        'inputs': ('seo', 'tech', 'competitive', 'performance'), 'output': 'benchmarks', 'section': 'benchmarks',
+        'label': '📈 Benchmarking against peer cohort...',
+        'summary': lambda b: (f"SEO score better than {b['cohorts']['all']['metrics'].get('seoScore', {}).get('betterThanPct')}% "
+                              f"of {b['population']} peers" if b['available'] else b['reason']),
+        'cost': 2,
+        'default': False,
+    },
+    'links': {
+        'module': 'link_health', 'func': 'audit',
+        'inputs': ('raw',), 'options': ('timeout',), 'output': 'linkHealth', 'merge': ('seo', 'linkHealth'),
+        'label': '🔗 Checking links...',
+        'summary': lambda l: (f"{l['checked']} links | Broken: {len(l['broken'])} | "
+                              f"Redirected: {len(l['redirected'])} | Slow: {len(l['slow'])}"),
+        'cost': 10,
+        'default': False,
+    },
+    'bundles': {
+        'module': 'bundle_scan', 'func': 'scan',
+        'inputs': ('raw', 'competitive'), 'options': ('timeout',), 'output': 'scriptScan',
+        'merge': ('competitive', 'scriptScan'),
+        'label': '📦 Scanning third-party scripts & GTM containers...',
+        'summary': lambda b: (f"{b['scanned']} scripts ({b['cacheHits']} cached) | "
+                              f"New trackers: {sum(len(x['newFindings']) for x in b['bundles'])}"),
+        'cost': 10,
+        'default': False,
+    },
+}
+
+# Context keys that are supplied by the caller rather than produced by a stage
+SEED_KEYS = ('url',)
+
+def register(name: str, module: str, func: str, inputs: tuple, output: str,
+             label: str = '', summary=None, default: bool = False, section: str | None = None,
+             options: tuple = (), reusable: bool = False, cost: float = 1, merge: tuple | None = None) -> None:
+    """Add an analyzer to the registry. Stages run in registration order."""
+    if name in ANALYZERS:
+        raise ValueError(f"Analyzer '{name}' is already registered")
+    ANALYZERS[name] = {
+        'module': module, 'func': func, 'inputs': tuple(inputs), 'output': output,
+        'label': label or f'Running {name}...', 'summary': summary, 'default': default,
+        'section': section, 'options': tuple(options), 'reusable': reusable, 'cost': cost,
+        'merge': tuple(merge) if merge else None,
+    }
+
+def producer_of(key: str) -> str | None:
+    for name, spec in ANALYZERS.items():
+        if spec['output'] == key:
+            return name
+    return None
+
+def parse_selection(value: str | None) -> list[str]:
+    """Parse a comma-separated flag value such as 'seo,tech' into analyzer names."""
+    if not value:
+        return []
+    names = [n.strip() for n in value.split(',') if n.strip()]
+    unknown = [n for n in names if n not in ANALYZERS]
+    if unknown:
+        raise ValueError(f"Unknown analyzer(s): {', '.join(unknown)}. Available: {', '.join(ANALYZERS)}")
+    return names
+
+def resolve(only: list[str] | None = None, extra: list[str] | None = None) -> list[str]:
+    """
+    Return the analyzers needed to produce the requested ones, in registry order.
+    With no selection, every default analyzer runs; `extra` adds optional ones on top.
+    """
+    wanted = list(only) if only else [n for n, s in ANALYZERS.items() if s['default']]
+    wanted += list(extra or [])
+    needed = set()
+    stack = list(wanted)
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        for key in ANALYZERS[name]['inputs']:
+            if key in SEED_KEYS:
+                continue
+            dep = producer_of(key)
+            if dep is None:
+                raise ValueError(f"No analyzer produces '{key}' required by '{name}'")
+            stack.append(dep)
+    return [n for n in ANALYZERS if n in needed]
+
+def load(name: str):
+    """Import the analyzer's module on first use and return its entry point."""
+    spec = ANALYZERS[name]
+    module = importlib.import_module(spec['module'])
+    return getattr(module, spec['func'])
+
+def call(name: str, ctx: dict):
+    spec = ANALYZERS[name]
+    func = load(name)
+    kwargs = {k: ctx[k] for k in spec.get('options', ()) if ctx.get(k) is not None}
+    return func(*[ctx[k] for k in spec['inputs']], **kwargs)
+
+def budgets(plan: list[str], seconds: float) -> dict:
+    """Split a total deadline across planned stages in proportion to their cost."""
+    total = sum(ANALYZERS[n].get('cost', 1) for n in plan) or 1
+    return {n: seconds * ANALYZERS[n].get('cost', 1) / total for n in plan}
+
+if __name__ == '__main__':
+    import sys
+    import json
+    only = parse_selection(sys.argv[1]) if len(sys.argv) > 1 else None
+    extra = parse_selection(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(json.dumps({
+        'plan': resolve(only, extra),
+        'analyzers': {n: {'inputs': s['inputs'], 'output': s['output'], 'default': s['default']}
+                      for n, s in ANALYZERS.items()}
+    }, indent=2))
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Tool: bundle_scan.py
+Purpose: Download third-party script bundles and GTM containers and scan them for ad networks and trackers
+Layer: B.L.A.S.T. Tool Layer
+SOP: architecture/04_competitive_intel.md
+"""
+
+import sys
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import http_fetch
+from url_cache import UrlCache
+from detect_competitive import GTM_ID, scan_text, social_proof
+
+SCAN_TTL_SECONDS = 24 * 3600    # after this, entries are revalidated with their ETag
+MAX_WORKERS = 16
+REQUEST_TIMEOUT = 10
+MAX_SCRIPTS = 40
+MAX_SCRIPT_BYTES = 2 * 1024 * 1024
+GTM_CONTAINER_URL = 'https://www.googletagmanager.com/gtm.js?id={}'
+
+def collect_scripts(raw: dict) -> list[str]:
+    """Third-party script URLs plus the GTM containers the page references, deduplicated."""
+    base = raw.get('finalUrl') or raw.get('url', '')
+    site = http_fetch.site_key(base)
+    urls = [GTM_CONTAINER_URL.format(c) for c in dict.fromkeys(GTM_ID.findall(raw.get('html', '')))]
+    for src in raw.get('scripts', []):
+        absolute = urljoin(base, src)
+        if absolute.startswith(('http://', 'https://')) and http_fetch.site_key(absolute) != site:
+            urls.append(absolute)
+    return list(dict.fromkeys(urls))[:MAX_SCRIPTS]
+
+def _header(headers: dict, name: str) -> str | None:
+    return next((v for k, v in headers.items() if k.lower() == name), None)
+
+def fetch_and_scan(session, url: str, stale: dict | None = None, timeout: float = REQUEST_TIMEOUT) -> dict:
+    """
+    Fetch one bundle and scan it. With a stale cache entry that has an ETag, ask
+    If-None-Match first and keep the old findings on a 304.
+    """
+    headers = {'Accept': '*/*'}
+    if stale and stale.get('etag'):
+        headers['If-None-Match'] = stale['etag']
+    try:
+        r = http_fetch.stream_get(url, timeout=timeout, headers=headers, max_bytes=MAX_SCRIPT_BYTES,
+                                  session=session, max_seconds=timeout)
+    except Exception as e:
+        return {'url': url, 'status': None, 'error': str(e)}
+    if r['statusCode'] == 304 and stale:
+        return dict(stale, revalidated=True)
+    if r['statusCode'] >= 400:
+        return {'url': url, 'status': r['statusCode'], 'error': f"HTTP {r['statusCode']}"}
+    # Code markers only: bundles name vendor domains they never load (gtag.js lists doubleclick.net)
+    ad_networks, tracking_pixels = scan_text(r['text'], '')
+    return {
+        'url': url,
+        'status': r['statusCode'],
+        'etag': _header(r['headers'], 'etag'),
+        'bytes': r['bytesRead'],
+        'truncated': r['truncated'],
+        'adNetworks': ad_networks,
+        'trackingPixels': tracking_pixels,
+    }
+
+def _scans(urls: list[str], session, cache: UrlCache, max_workers: int,
+           timeout: float | None) -> tuple[dict, int, int]:
+    found = cache.get_many(urls)
+    cache_hits = len(found)
+
+    missing = [u for u in urls if u not in found]
+    revalidated = 0
+    if missing:
+        stale = {u: entry[0] for u in missing if (entry := cache.get_entry(u)) is not None}
+        session = session or http_fetch.new_session(max_workers)
+        per_request = min(REQUEST_TIMEOUT, timeout) if timeout else REQUEST_TIMEOUT
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            fetched = dict(zip(missing, pool.map(
+                lambda u: fetch_and_scan(session, u, stale.get(u), per_request), missing)))
+        revalidated = sum(1 for info in fetched.values() if info.pop('revalidated', False))
+        # Errors are usually transient, and a truncated scan may have missed a tracker
+        cache.set_many({u: info for u, info in fetched.items() if not info.get('error') and not info.get('truncated')})
+        found.update(fetched)
+    return found, cache_hits, revalidated
+
+def scan(raw: dict, competitive: dict, session=None, cache: UrlCache | None = None,
+         max_workers: int = MAX_WORKERS, timeout: float | None = None) -> dict:
+    """
+    Pipeline stage: trackers found inside script bundles, merged with the page-level
+    competitive findings. Bundles are cached by URL across all sites (vendor scripts are
+    shared by thousands of them) and revalidated by ETag once stale.
+    """
+    urls = collect_scripts(raw)
+    if cache is None:
+        # v2: code markers only. A 304 keeps cached findings, so v1 entries would never be rescanned
+        with UrlCache('script_scans_v2', SCAN_TTL_SECONDS) as own_cache:
+            found, cache_hits, revalidated = _scans(urls, session, own_cache, max_workers, timeout)
+    else:
+        found, cache_hits, revalidated = _scans(urls, session, cache, max_workers, timeout)
+
+    ad_networks = list(competitive.get('adNetworks', []))
+    tracking_pixels = list(competitive.get('trackingPixels', []))
+    bundles = []
+    for url in urls:
+        info = found[url]
+        new_ads = [n for n in info.get('adNetworks', []) if n not in ad_networks]
+        new_pixels = [p for p in info.get('trackingPixels', []) if p not in tracking_pixels]
+        ad_networks += new_ads
+        tracking_pixels += new_pixels
+        if info.get('adNetworks') or info.get('trackingPixels') or info.get('error'):
+            bundles.append({'url': url, 'adNetworks': info.get('adNetworks', []),
+                            'trackingPixels': info.get('trackingPixels', []),
+                            'newFindings': new_ads + new_pixels, 'error': info.get('error')})
+
+    containers = [u for u in urls if u.startswith(GTM_CONTAINER_URL.format(''))]
+    out = {
+        'adsRunning': bool(ad_networks),
+        'adNetworks': ad_networks,
+        'trackingPixels': tracking_pixels,
+        'socialProof': social_proof(tracking_pixels),
+        'scanned': len(urls),
+        'cacheHits': cache_hits,
+        'revalidated': revalidated,
+        'containers': containers,
+        'bundles': bundles,
+    }
+    if containers and competitive.get('googleTagManager'):
+        inside = sorted({f for b in bundles if b['url'] in containers for f in b['newFindings']})
+        out['gtmNote'] = (f"GTM container scanned — loads {', '.join(inside)}" if inside
+                          else 'GTM container scanned — no additional trackers found')
+    return out
+
+# ── LOCAL STUB SERVER ────────────────────────────────────
+
+# path → (bundle body, expected (ad networks, tracking pixels))
+STUB_BUNDLES = {
+    '/gtag.js': ('var hosts=["https://stats.g.doubleclick.net","https://pagead2.googlesyndication.com"];', ([], [])),
+    '/ads.js': ('(adsbygoogle = window.adsbygoogle || []).push({});', (['Google Ads / AdSense'], [])),
+    '/pixel.js': ("fbq('init', '1234567890');", (['Facebook Ads'], ['Meta Pixel'])),
+}
+
+def serve_stub(port: int = 0):
+    """
+    Start a local server that serves STUB_BUNDLES, for checking the scan offline.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    import threading
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = STUB_BUNDLES.get(self.path.split('?')[0], (None,))[0]
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/javascript')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def check_stub() -> dict:
+    """
+    Scan every stub bundle and compare with its expected findings; also check that a page
+    whose only bundle merely names ad domains is not reported as running ads.
+    """
+    server, base = serve_stub()
+    try:
+        session = http_fetch.new_session(4)
+        checks = []
+        for path, (_, (want_ads, want_pixels)) in STUB_BUNDLES.items():
+            info = fetch_and_scan(session, base + path)
+            checks.append({'path': path, 'adNetworks': info.get('adNetworks'),
+                           'trackingPixels': info.get('trackingPixels'),
+                           'ok': (info.get('adNetworks'), info.get('trackingPixels')) == (want_ads, want_pixels)})
+        raw = {'url': 'https://shop.example/', 'html': '', 'scripts': [base + '/gtag.js']}
+        # An in-memory cache so the stub's answers never land in the shared one
+        with UrlCache('script_scans_stub', 0, path=':memory:') as cache:
+            result = scan(raw, {}, session=session, cache=cache)
+        checks.append({'path': '(scan adsRunning, domain mentions only)', 'adsRunning': result['adsRunning'],
+                       'ok': result['adsRunning'] is False and not result['trackingPixels']})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {'ok': all(c['ok'] for c in checks), 'checks': checks}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python bundle_scan.py <path_to_raw> | --stub")
+        sys.exit(1)
+
+    if sys.argv[1] == '--stub':
+        report = check_stub()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['ok'] else 1)
+
+    import storage
+    from detect_competitive import detect
+    raw = storage.load_raw(sys.argv[1])
+    print(json.dumps(scan(raw, detect(raw)), indent=2))
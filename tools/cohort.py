@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Tool: cohort.py
+Purpose: Columnar cohort analytics over stored results — percentiles, histograms, per-framework/CMS benchmarks
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import glob
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import storage
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+COHORT_PATH = os.path.join(TMP_DIR, 'cohort.npz')
+
+# metric → True if a higher value is better
+METRICS = {
+    'seoScore': True,
+    'issueCount': False,
+    'criticalIssues': False,
+    'trackerCount': False,
+    'adNetworkCount': False,
+    'loadTimeMs': False,
+    'performanceScore': True,
+}
+CATEGORIES = ('framework', 'cms')
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+def _require_numpy() -> None:
+    if np is None:
+        print("ERROR: Cohort analytics need numpy. Run: pip install numpy")
+        sys.exit(1)
+
+def _row(result: dict) -> tuple[dict, dict] | None:
+    """Extract one result's numeric metrics and category labels; None for failed runs."""
+    if result.get('status') not in ('done', 'partial'):
+        return None
+    seo = result.get('seo') or {}
+    comp = result.get('competitive') or {}
+    tech = result.get('techStack') or {}
+    perf = result.get('performance') or {}
+    issues = seo.get('issues')
+    metrics = {
+        'seoScore': seo.get('score'),
+        'issueCount': len(issues) if issues is not None else None,
+        'criticalIssues': sum(1 for i in issues if i.get('severity') == 'critical') if issues is not None else None,
+        'trackerCount': len(comp['trackingPixels']) if 'trackingPixels' in comp else None,
+        'adNetworkCount': len(comp['adNetworks']) if 'adNetworks' in comp else None,
+        'loadTimeMs': result['loadTimeMs'] if result.get('loadTimeMs') is not None else perf.get('loadTimeMs'),
+        'performanceScore': perf.get('score'),
+    }
+    labels = {c: tech.get(c) or 'Unknown' for c in CATEGORIES}
+    return metrics, labels
+
+class Cohort:
+    """
+    Results held column-wise: one float32 array per metric (NaN where missing) and one
+    small-int code array per category, so every statistic is a vectorized NumPy call.
+    """
+
+    def __init__(self, columns: dict, codes: dict, vocab: dict, ids, sources):
+        self.columns = columns
+        self.codes = codes
+        self.vocab = vocab
+        self.ids = ids
+        self.sources = sources
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ── BUILD / PERSIST ───────────────────────────────────
+
+    @classmethod
+    def empty(cls) -> 'Cohort':
+        _require_numpy()
+        return cls({m: np.empty(0, np.float32) for m in METRICS},
+                   {c: np.empty(0, np.int32) for c in CATEGORIES},
+                   {c: [] for c in CATEGORIES}, np.empty(0, dtype='U16'), np.empty(0, dtype='U64'))
+
+    @classmethod
+    def load(cls, path: str = COHORT_PATH) -> 'Cohort':
+        _require_numpy()
+        if not os.path.exists(path):
+            return cls.empty()
+        with np.load(path, allow_pickle=False) as z:
+            columns = {m: z[f'm_{m}'] for m in METRICS if f'm_{m}' in z}
+            for m in METRICS:
+                columns.setdefault(m, np.full(len(z['ids']), np.nan, np.float32))
+            return cls(columns,
+                       {c: z[f'c_{c}'] for c in CATEGORIES},
+                       {c: z[f'v_{c}'].tolist() for c in CATEGORIES},
+                       z['ids'], z['sources'])
+
+    def save(self, path: str = COHORT_PATH) -> None:
+        arrays = {f'm_{m}': a for m, a in self.columns.items()}
+        arrays.update({f'c_{c}': a for c, a in self.codes.items()})
+        arrays.update({f'v_{c}': np.array(v, dtype=str) for c, v in self.vocab.items()})
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, ids=self.ids, sources=self.sources, **arrays)
+        os.replace(tmp_path, path)
+
+    def extend(self, paths: list[str]) -> int:
+        """Parse result files not yet in the cohort and append them. Returns rows added."""
+        known = set(self.sources.tolist())
+        values = {m: [] for m in METRICS}
+        labels = {c: [] for c in CATEGORIES}
+        ids, sources = [], []
+        for path in paths:
+            name = os.path.basename(path)
+            if name in known:
+                continue
+            try:
+                result = storage.read(path)
+            except Exception:
+                continue
+            row = _row(result)
+            if row is None:
+                continue
+            metrics, cats = row
+            for m in METRICS:
+                v = metrics[m]
+                values[m].append(float('nan') if v is None else v)
+            for c in CATEGORIES:
+                labels[c].append(cats[c])
+            ids.append(result.get('id', ''))
+            sources.append(name)
+
+        if not ids:
+            return 0
+        for m in METRICS:
+            self.columns[m] = np.concatenate([self.columns[m], np.asarray(values[m], np.float32)])
+        for c in CATEGORIES:
+            index = {v: i for i, v in enumerate(self.vocab[c])}
+            new_codes = np.fromiter((index.setdefault(v, len(index)) for v in labels[c]), np.int32, len(labels[c]))
+            self.vocab[c] = list(index)
+            self.codes[c] = np.concatenate([self.codes[c], new_codes])
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype='U16')])
+        self.sources = np.concatenate([self.sources, np.asarray(sources, dtype='U64')])
+        return len(ids)
+
+    # ── QUERIES ───────────────────────────────────────────
+
+    def mask(self, **where) -> 'np.ndarray':
+        """Boolean row mask for category filters, e.g. mask(cms='Shopify')."""
+        m = np.ones(len(self), bool)
+        for cat, label in where.items():
+            if label is None:
+                continue
+            code = self.vocab[cat].index(label) if label in self.vocab[cat] else -1
+            m &= self.codes[cat] == code
+        return m
+
+    def _values(self, metric: str, mask=None) -> 'np.ndarray':
+        col = self.columns[metric] if mask is None else self.columns[metric][mask]
+        return col[~np.isnan(col)]
+
+    def percentiles(self, metric: str, qs=PERCENTILES, mask=None) -> dict:
+        vals = self._values(metric, mask)
+        if not len(vals):
+            return {}
+        return {f'p{q}': round(float(v), 2) for q, v in zip(qs, np.percentile(vals, qs))}
+
+    def histogram(self, metric: str, bins: int = 10, mask=None) -> dict:
+        vals = self._values(metric, mask)
+        if not len(vals):
+            return {'counts': [], 'edges': []}
+        counts, edges = np.histogram(vals, bins=bins)
+        return {'counts': counts.tolist(), 'edges': [round(float(e), 2) for e in edges]}
+
+    def breakdown(self, metric: str, by: str, min_count: int = 1) -> list[dict]:
+        """Count, mean and median of a metric per category label, largest groups first."""
+        col, codes = self.columns[metric], self.codes[by]
+        ok = ~np.isnan(col)
+        col, codes = col[ok], codes[ok]
+        if not len(col):
+            return []
+        order = np.lexsort((col, codes))  # group by code, values sorted within each group
+        col, codes = col[order], codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, len(codes)])
+        sums = np.add.reduceat(col.astype(np.float64), starts)
+        mid_lo = starts + (counts - 1) // 2
+        mid_hi = starts + counts // 2
+        medians = (col[mid_lo] + col[mid_hi]) / 2
+        rows = [
+            {by: self.vocab[by][codes[s]], 'count': int(n), 'mean': round(float(t / n), 2), 'median': round(float(med), 2)}
+            for s, n, t, med in zip(starts, counts, sums, medians) if n >= min_count
+        ]
+        return sorted(rows, key=lambda r: r['count'], reverse=True)
+
+    def better_than(self, metric: str, value, mask=None) -> float | None:
+        """Percentage of peers this value beats (ties count as not beaten)."""
+        if value is None:
+            return None
+        vals = np.sort(self._values(metric, mask))
+        if not len(vals):
+            return None
+        if METRICS[metric]:
+            beaten = np.searchsorted(vals, value, side='left')
+        else:
+            beaten = len(vals) - np.searchsorted(vals, value, side='right')
+        return round(float(beaten) / len(vals) * 100, 1)
+
+def result_paths(directory: str = TMP_DIR) -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, '*_result.json')) +
+                  glob.glob(os.path.join(directory, '*_result.msgpack')))
+
+def build(directory: str = TMP_DIR, path: str = COHORT_PATH) -> Cohort:
+    cohort = Cohort.load(path)
+    added = cohort.extend(result_paths(directory))
+    if added:
+        cohort.save(path)
+    return cohort
+
+_loaded = None
+
+def compare(seo: dict, tech: dict, competitive: dict, performance: dict) -> dict:
+    """Pipeline stage: 'better than X% of peers' figures against all results and same-CMS/framework cohorts."""
+    global _loaded
+    if np is None:
+        return {'available': False, 'reason': 'numpy not installed'}
+    if _loaded is None:
+        _loaded = Cohort.load()
+    cohort = _loaded
+    if not len(cohort):
+        return {'available': False, 'reason': 'No cohort built yet — run: python cohort.py build'}
+
+    metrics, labels = _row({'status': 'done', 'seo': seo, 'techStack': tech,
+                            'competitive': competitive, 'performance': performance or {}})
+
+    cohorts = {'all': None}
+    cohorts.update({f'{c}:{labels[c]}': cohort.mask(**{c: labels[c]}) for c in CATEGORIES if labels[c] != 'Unknown'})
+    out = {'available': True, 'population': len(cohort), 'cohorts': {}}
+    for name, m in cohorts.items():
+        size = len(cohort) if m is None else int(m.sum())
+        if not size:
+            continue
+        out['cohorts'][name] = {
+            'size': size,
+            'metrics': {
+                metric: {'value': value, 'betterThanPct': cohort.better_than(metric, value, m),
+                         'median': cohort.percentiles(metric, (50,), m).get('p50')}
+                for metric, value in metrics.items() if value is not None
+            },
+        }
+    return out
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cohort analytics over stored pipeline results')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('build', help='Add new result files to the columnar cohort store')
+    b.add_argument('directory', nargs='?', default=TMP_DIR)
+    st = sub.add_parser('stats', help='Percentiles, histogram and breakdown for one metric')
+    st.add_argument('metric', choices=list(METRICS))
+    st.add_argument('--by', choices=CATEGORIES, default='framework')
+    st.add_argument('--bins', type=int, default=10)
+    r = sub.add_parser('rank', help='Benchmark one stored result against the cohort')
+    r.add_argument('result')
+    args = parser.parse_args()
+
+    _require_numpy()
+    if args.cmd == 'build':
+        cohort = build(args.directory)
+        print(json.dumps({'rows': len(cohort), 'path': COHORT_PATH}, indent=2))
+    elif args.cmd == 'stats':
+        cohort = Cohort.load()
+        print(json.dumps({
+            'rows': len(cohort),
+            'percentiles': cohort.percentiles(args.metric),
+            'histogram': cohort.histogram(args.metric, args.bins),
+            'breakdown': cohort.breakdown(args.metric, args.by),
+        }, indent=2))
+    else:
+        result = storage.read(args.result)
+        performance = result.get('performance') or {'loadTimeMs': result.get('loadTimeMs')}
+        print(json.dumps(compare(result.get('seo') or {}, result.get('techStack') or {},
+                                 result.get('competitive') or {}, performance), indent=2))
@@ -11,89 +11,66 @@ import json
 import os
 import re
 
-def detect(raw: dict) -> dict:
+SIMILARWEB_TIMEOUT = 10  # seconds
+
+_GA4_ID = re.compile(r"G-[A-Z0-9]{8,}")
+_UA_ID = re.compile(r"UA-\d+-\d+")
+GTM_ID = re.compile(r"GTM-[A-Z0-9]+")
+
+# (ad network, tracking pixel, script-URL markers, code markers, code regexes), in report order.
+# Markers are lowercase substrings; regexes run case-sensitively on the original code.
+# The same table scans page HTML (detect) and downloaded script bundles (scan_text).
+SIGNATURES = (
+    ('Google Ads / AdSense', None, ('googlesyndication.com', 'doubleclick.net'),
+     ('adsbygoogle', 'googletag.cmd', 'googletag.pubads'), ()),
+    ('Facebook Ads', 'Meta Pixel', ('connect.facebook.net',), (), (re.compile(r"fbq\((['\"])init\1"),)),
+    ('TikTok Ads', 'TikTok Pixel', ('analytics.tiktok.com',), ('ttq.load',), ()),
+    ('Taboola', None, ('cdn.taboola.com',), ('window._taboola',), ()),
+    ('Outbrain', None, ('widgets.outbrain.com',), (), (re.compile(r'window\.obApi'),)),
+    ('Criteo', None, ('static.criteo.net',), ('window.criteo_q',), ()),
+    ('X (Twitter) Ads', 'Twitter Pixel', ('static.ads-twitter.com',), ('twq(',), ()),
+    ('LinkedIn Ads', 'LinkedIn Insight Tag', ('snap.licdn.com',), (), (re.compile(r'_linkedin_partner_id'),)),
+    (None, 'Google Analytics', ('gtag.js', 'analytics.js'), (), (_GA4_ID, _UA_ID)),
+    (None, 'GA4', (), (), (_GA4_ID,)),
+    (None, 'Hotjar', ('static.hotjar.com',), ('window.hj',), ()),
+    (None, 'Mixpanel', ('cdn.mxpnl.com',), ('mixpanel.init',), ()),
+    (None, 'Segment', ('cdn.segment.com',), ('analytics.load',), ()),
+    (None, 'HubSpot', ('js.hs-scripts.com',), ('hubspot',), ()),
+    (None, 'Intercom', ('widget.intercom.io',), (), (re.compile(r'window\.intercomSettings'),)),
+)
+
+def scan_text(code: str, script_urls: str | None = None) -> tuple[list[str], list[str]]:
+    """
+    Match SIGNATURES against code (page HTML or a script bundle) and a string of script
+    URLs. For a bundle, pass script_urls='' so only code markers count: bundles mention
+    vendor domains they never load.
+    Returns (ad networks, tracking pixels) in table order.
+    """
+    code_lower = code.lower()
+    urls = code_lower if script_urls is None else script_urls.lower()
+    ad_networks, tracking_pixels = [], []
+    for network, pixel, url_markers, code_markers, patterns in SIGNATURES:
+        if (any(m in urls for m in url_markers) or any(m in code_lower for m in code_markers)
+                or any(p.search(code) for p in patterns)):
+            if network:
+                ad_networks.append(network)
+            if pixel:
+                tracking_pixels.append(pixel)
+    return ad_networks, tracking_pixels
+
+def social_proof(tracking_pixels: list[str]) -> dict:
+    return {
+        'hasPixel': 'Meta Pixel' in tracking_pixels or 'Twitter Pixel' in tracking_pixels,
+        'networks': [n.split(' Pixel')[0] for n in tracking_pixels if 'Pixel' in n or 'Insight' in n]
+    }
+
+def detect(raw: dict, timeout: float | None = None) -> dict:
     html = raw.get('html', '')
     scripts = raw.get('scripts', [])
-    html_lower = html.lower()
-    scripts_str = ' '.join(scripts).lower()
-
-    ad_networks = []
-    tracking_pixels = []
-
-    # ── GOOGLE ADS / ADSENSE ──────────────────────────────
-    if ('adsbygoogle' in html_lower or
-        'googlesyndication.com' in scripts_str or
-        'doubleclick.net' in scripts_str or
-        'googletag.cmd' in html_lower or
-        'googletag.pubads' in html_lower):
-        ad_networks.append('Google Ads / AdSense')
-
-    # ── FACEBOOK / META PIXEL ─────────────────────────────
-    if ("fbq('init'" in html or
-        "fbq(\"init\"" in html or
-        'connect.facebook.net' in scripts_str):
-        ad_networks.append('Facebook Ads')
-        tracking_pixels.append('Meta Pixel')
-
-    # ── TIKTOK ───────────────────────────────────────────
-    if 'analytics.tiktok.com' in scripts_str or 'ttq.load' in html_lower:
-        ad_networks.append('TikTok Ads')
-        tracking_pixels.append('TikTok Pixel')
-
-    # ── TABOOLA ──────────────────────────────────────────
-    if 'cdn.taboola.com' in scripts_str or 'window._taboola' in html_lower:
-        ad_networks.append('Taboola')
-
-    # ── OUTBRAIN ─────────────────────────────────────────
-    if 'widgets.outbrain.com' in scripts_str or 'window.obApi' in html:
-        ad_networks.append('Outbrain')
-
-    # ── CRITEO ───────────────────────────────────────────
-    if 'static.criteo.net' in scripts_str or 'window.criteo_q' in html_lower:
-        ad_networks.append('Criteo')
-
-    # ── TWITTER / X ADS ──────────────────────────────────
-    if 'static.ads-twitter.com' in scripts_str or 'twq(' in html_lower:
-        ad_networks.append('X (Twitter) Ads')
-        tracking_pixels.append('Twitter Pixel')
-
-    # ── LINKEDIN ─────────────────────────────────────────
-    if '_linkedin_partner_id' in html or 'snap.licdn.com' in scripts_str:
-        ad_networks.append('LinkedIn Ads')
-        tracking_pixels.append('LinkedIn Insight Tag')
-
-    # ── GOOGLE ANALYTICS ─────────────────────────────────
-    if ('gtag.js' in scripts_str or 'analytics.js' in scripts_str or
-        re.search(r"G-[A-Z0-9]{8,}", html) or
-        re.search(r"UA-\d+-\d+", html)):
-        tracking_pixels.append('Google Analytics')
-
-    # ── GA4 ───────────────────────────────────────────────
-    if re.search(r"G-[A-Z0-9]{8,}", html):
-        tracking_pixels.append('GA4')
-
-    # ── HOTJAR ───────────────────────────────────────────
-    if 'static.hotjar.com' in scripts_str or 'window.hj' in html_lower:
-        tracking_pixels.append('Hotjar')
-
-    # ── MIXPANEL ─────────────────────────────────────────
-    if 'cdn.mxpnl.com' in scripts_str or 'mixpanel.init' in html_lower:
-        tracking_pixels.append('Mixpanel')
-
-    # ── SEGMENT ──────────────────────────────────────────
-    if 'cdn.segment.com' in scripts_str or 'analytics.load' in html_lower:
-        tracking_pixels.append('Segment')
-
-    # ── HUBSPOT ──────────────────────────────────────────
-    if 'js.hs-scripts.com' in scripts_str or 'hubspot' in html_lower:
-        tracking_pixels.append('HubSpot')
-
-    # ── INTERCOM ─────────────────────────────────────────
-    if 'widget.intercom.io' in scripts_str or 'window.intercomSettings' in html:
-        tracking_pixels.append('Intercom')
+    ad_networks, tracking_pixels = scan_text(html, ' '.join(scripts))
 
     # ── GTM (special case) ────────────────────────────────
-    gtm = bool(re.search(r"GTM-[A-Z0-9]+", html))
+    gtm = bool(GTM_ID.search(html))
     if gtm:
         tracking_pixels.append('Google Tag Manager')
 
@@ -110,7 +87,7 @@ def detect(raw: dict) -> dict:
             r = requests.get(
                 f'https://api.similarweb.com/v1/website/{domain}/total-traffic-and-engagement/visits',
                 params={'api_key': api_key, 'start_date': '2024-01', 'end_date': '2024-12', 'granularity': 'monthly'},
-                timeout=10
+                timeout=min(SIMILARWEB_TIMEOUT, timeout) if timeout else SIMILARWEB_TIMEOUT
             )
             if r.status_code == 200:
                 data = r.json()
@@ -134,10 +111,7 @@ def detect(raw: dict) -> dict:
         'gtmNote': 'GTM detected — additional trackers may be loaded dynamically' if gtm else None,
         'estimatedMonthlyTraffic': estimated_traffic,
         'trafficSource': traffic_source,
-        'socialProof': {
-            'hasPixel': 'Meta Pixel' in tracking_pixels or 'Twitter Pixel' in tracking_pixels,
-            'networks': [n.split(' Pixel')[0] for n in tracking_pixels if 'Pixel' in n or 'Insight' in n]
-        },
+        'socialProof': social_proof(tracking_pixels),
         'domainAuthority': None,
         'backlinks': None
     }
@@ -147,8 +121,8 @@ if __name__ == '__main__':
         print("Usage: python detect_competitive.py <path_to_raw.json>")
         sys.exit(1)
 
-    with open(sys.argv[1]) as f:
-        raw = json.load(f)
+    import storage
+    raw = storage.load_raw(sys.argv[1])
 
     result = detect(raw)
     print(json.dumps(result, indent=2))
@@ -10,6 +10,87 @@ import sys
 import json
 import re
 
+def _next_header(headers: dict) -> bool:
+    return any('next' in v for k, v in headers.items() if 'x-powered-by' in k)
+
+def _shopify_cookie(cookies: list[str]) -> bool:
+    return any('_shopify' in c for c in cookies)
+
+def _server_rules(headers: dict, cookies: list[str], framework: str | None) -> tuple[dict, list]:
+    """Server, hosting, CDN and language from lowercased headers and cookie names, plus their signals."""
+    signals = []
+
+    # --- SERVER / HOSTING / CDN ---
+    server = headers.get('server', None)
+    if server:
+        if 'nginx' in server: server = 'nginx'
+        elif 'apache' in server: server = 'Apache'
+        elif 'cloudflare' in server: server = 'Cloudflare'
+        elif 'iis' in server: server = 'IIS'
+        signals.append(('server', server, 10))
+
+    hosting = None
+    if 'x-vercel-id' in headers or any('vercel' in v for v in headers.values()):
+        hosting = 'Vercel'
+        signals.append(('hosting', 'Vercel', 20))
+    elif 'x-netlify' in headers or 'netlify-vary' in headers:
+        hosting = 'Netlify'
+        signals.append(('hosting', 'Netlify', 20))
+    elif 'x-amz-cf-id' in headers or 'x-amzn-requestid' in headers:
+        hosting = 'AWS'
+        signals.append(('hosting', 'AWS', 15))
+    elif 'x-github-request-id' in headers:
+        hosting = 'GitHub Pages'
+        signals.append(('hosting', 'GitHub Pages', 20))
+
+    cdn = None
+    if 'cf-cache-status' in headers or 'cf-ray' in headers:
+        cdn = 'Cloudflare'
+        signals.append(('cdn', 'Cloudflare', 15))
+    elif 'x-amz-cf-id' in headers:
+        cdn = 'AWS CloudFront'
+        signals.append(('cdn', 'AWS CloudFront', 15))
+    elif 'x-fastly-request-id' in headers:
+        cdn = 'Fastly'
+        signals.append(('cdn', 'Fastly', 15))
+
+    # --- LANGUAGE ---
+    language = None
+    if any('phpsessid' in c for c in cookies) or (server and 'php' in headers.get('x-powered-by', '')):
+        language = 'PHP'
+        signals.append(('language', 'PHP', 20))
+    elif any('jsessionid' in c for c in cookies):
+        language = 'Java'
+        signals.append(('language', 'Java', 20))
+    elif framework in ('Next.js', 'Gatsby', 'Nuxt.js') or (server and 'node' in server):
+        language = 'Node.js'
+        signals.append(('language', 'Node.js', 15))
+
+    return {'server': server, 'hosting': hosting, 'cdn': cdn, 'language': language}, signals
+
+def detect_infra(headers: dict, cookies: list[str], framework: str | None = None) -> dict:
+    """
+    The rules that need only response headers and cookie names: server, hosting, CDN,
+    language, plus the X-Powered-By Next.js and Shopify-cookie hints. Used by the
+    header-only triage probe; detect() applies the same rules in its own order. Unknown
+    fields are None.
+    """
+    headers = {k.lower(): v.lower() for k, v in headers.items()}
+    cookies = [c.lower() for c in cookies]
+    signals = []
+
+    if _next_header(headers):
+        framework = framework or 'Next.js'
+        signals.append(('framework', 'Next.js (header)', 20))
+
+    cms = None
+    if _shopify_cookie(cookies):
+        cms = 'Shopify'
+        signals.append(('cms', 'Shopify (cookie)', 30))
+
+    infra, infra_signals = _server_rules(headers, cookies, framework)
+    return {'framework': framework, 'cms': cms, **infra, 'signals': signals + infra_signals}
+
 def detect(raw: dict) -> dict:
     html = raw.get('html', '')
     headers = {k.lower(): v.lower() for k, v in raw.get('headers', {}).items()}
@@ -43,7 +124,7 @@ def detect(raw: dict) -> dict:
         framework = 'React'
         signals.append(('framework', 'React', 15))
 
-    if any('x-powered-by' in k and 'next' in v for k, v in headers.items() if 'x-powered-by' in k):
+    if _next_header(headers):
         framework = framework or 'Next.js'
         signals.append(('framework', 'Next.js (header)', 20))
 
@@ -80,58 +161,16 @@ def detect(raw: dict) -> dict:
         elif 'window.shopify' in html_lower or 'cdn.shopify.com' in html_lower:
             cms = 'Shopify'
             signals.append(('cms', 'Shopify (global)', 35))
-        elif any('_shopify' in c for c in cookies):
+        elif _shopify_cookie(cookies):
             cms = 'Shopify'
             signals.append(('cms', 'Shopify (cookie)', 30))
         elif '/sites/default/' in html_lower:
             cms = 'Drupal'
             signals.append(('cms', 'Drupal (path)', 30))
 
-    # --- SERVER / HOSTING / CDN ---
-    server = headers.get('server', None)
-    if server:
-        if 'nginx' in server: server = 'nginx'
-        elif 'apache' in server: server = 'Apache'
-        elif 'cloudflare' in server: server = 'Cloudflare'
-        elif 'iis' in server: server = 'IIS'
-        signals.append(('server', server, 10))
-
-    hosting = None
-    if 'x-vercel-id' in headers or any('vercel' in v for v in headers.values()):
-        hosting = 'Vercel'
-        signals.append(('hosting', 'Vercel', 20))
-    elif 'x-netlify' in headers or 'netlify-vary' in headers:
-        hosting = 'Netlify'
-        signals.append(('hosting', 'Netlify', 20))
-    elif 'x-amz-cf-id' in headers or 'x-amzn-requestid' in headers:
-        hosting = 'AWS'
-        signals.append(('hosting', 'AWS', 15))
-    elif 'x-github-request-id' in headers:
-        hosting = 'GitHub Pages'
-        signals.append(('hosting', 'GitHub Pages', 20))
-
-    cdn = None
-    if 'cf-cache-status' in headers or 'cf-ray' in headers:
-        cdn = 'Cloudflare'
-        signals.append(('cdn', 'Cloudflare', 15))
-    elif 'x-amz-cf-id' in headers:
-        cdn = 'AWS CloudFront'
-        signals.append(('cdn', 'AWS CloudFront', 15))
-    elif 'x-fastly-request-id' in headers:
-        cdn = 'Fastly'
-        signals.append(('cdn', 'Fastly', 15))
-
-    # --- LANGUAGE ---
-    language = None
-    if any('phpsessid' in c for c in cookies) or (server and 'php' in headers.get('x-powered-by', '')):
-        language = 'PHP'
-        signals.append(('language', 'PHP', 20))
-    elif any('jsessionid' in c for c in cookies):
-        language = 'Java'
-        signals.append(('language', 'Java', 20))
-    elif framework in ('Next.js', 'Gatsby', 'Nuxt.js') or (server and 'node' in server):
-        language = 'Node.js'
-        signals.append(('language', 'Node.js', 15))
+    infra, infra_signals = _server_rules(headers, cookies, framework)
+    signals += infra_signals
+    server, hosting, cdn, language = infra['server'], infra['hosting'], infra['cdn'], infra['language']
 
     # --- LIBRARIES ---
     libraries = []
@@ -166,13 +205,64 @@ def detect(raw: dict) -> dict:
         'confidence': confidence
     }
 
+# ── REGRESSION FIXTURES ──────────────────────────────────
+
+# Precedence cases; CHECK_EXPECTED is what detect() returned for each before the header and
+# cookie rules were shared with triage, and must not change (python detect_tech.py --check)
+CHECK_FIXTURES = {
+    'shopify-cookie-drupal-path': {'html': '<img src="/sites/default/files/a.png">', 'cookies': ['_shopify_y']},
+    'generator-beats-cookie': {'metaTags': [{'name': 'generator', 'content': 'WordPress 6.4'}],
+                               'cookies': ['_shopify_s']},
+    'wp-paths-beat-cookie': {'html': '<link href="/wp-content/x.css">', 'cookies': ['_shopify_y']},
+    'next-html-and-header': {'html': '<script src="/_next/static/chunks/main.js"></script>',
+                             'headers': {'X-Powered-By': 'Next.js', 'x-vercel-id': 'iad1::abc'}},
+    'next-header-only': {'html': '<div ng-version="17"></div>', 'headers': {'X-Powered-By': 'Next.js'},
+                         'cookies': ['_shopify_y']},
+    'infra-headers': {'headers': {'Server': 'nginx/1.25', 'CF-Ray': '1', 'X-Powered-By': 'PHP/8.2'},
+                      'cookies': ['PHPSESSID']},
+    'plain': {'html': '<p>hello</p>', 'cookies': ['JSESSIONID']},
+}
+CHECK_EXPECTED = {
+    'shopify-cookie-drupal-path': {'framework': 'Unknown', 'cms': 'Shopify', 'signals': [
+        ('cms', 'Shopify (cookie)', 30)]},
+    'generator-beats-cookie': {'framework': 'Unknown', 'cms': 'WordPress', 'signals': [
+        ('cms', 'WordPress', 40)]},
+    'wp-paths-beat-cookie': {'framework': 'Unknown', 'cms': 'WordPress', 'signals': [
+        ('cms', 'WordPress (paths)', 35)]},
+    'next-html-and-header': {'framework': 'Next.js', 'cms': 'None', 'signals': [
+        ('framework', 'Next.js', 30), ('framework', 'Next.js (header)', 20),
+        ('hosting', 'Vercel', 20), ('language', 'Node.js', 15)]},
+    'next-header-only': {'framework': 'Angular', 'cms': 'Shopify', 'signals': [
+        ('framework', 'Angular', 25), ('framework', 'Next.js (header)', 20),
+        ('cms', 'Shopify (cookie)', 30)]},
+    'infra-headers': {'framework': 'Unknown', 'cms': 'None', 'signals': [
+        ('server', 'nginx', 10), ('cdn', 'Cloudflare', 15),
+        ('language', 'PHP', 20)]},
+    'plain': {'framework': 'Unknown', 'cms': 'None', 'signals': [
+        ('language', 'Java', 20)]},
+}
+
+def check() -> dict:
+    """Run detect() on CHECK_FIXTURES and compare framework, cms and the signal order with CHECK_EXPECTED."""
+    checks = []
+    for name, raw in CHECK_FIXTURES.items():
+        got = detect(raw)
+        got = {'framework': got['framework'], 'cms': got['cms'], 'signals': got['signals']}
+        checks.append({'fixture': name, 'ok': got == CHECK_EXPECTED[name], **got})
+    return {'ok': all(c['ok'] for c in checks), 'checks': checks}
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python detect_tech.py <path_to_raw.json>")
+        print("Usage: python detect_tech.py <path_to_raw.json> | --check")
         sys.exit(1)
+
+    if sys.argv[1] == '--check':
+        report = check()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['ok'] else 1)
     
-    with open(sys.argv[1]) as f:
-        raw = json.load(f)
+    import storage
+    raw = storage.load_raw(sys.argv[1])
     
     result = detect(raw)
     print(json.dumps(result, indent=2))
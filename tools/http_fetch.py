@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tool: http_fetch.py
+Purpose: Streamed, size-capped HTTP downloads shared by the scraper and network-bound stages
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+import time
+
+import ipaddress
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'SiteIntelBot/1.0'
+MAX_BODY_BYTES = int(os.environ.get('SITE_INTEL_MAX_BODY_BYTES', 5 * 1024 * 1024))  # 5 MB
+CHUNK_SIZE = 64 * 1024
+
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+TEXT_TYPES = ('text/', 'application/xml', 'application/rss+xml', 'application/atom+xml')
+
+def new_session(pool_size: int = 16) -> requests.Session:
+    """A keep-alive session whose connection pool matches the caller's worker count."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def site_key(url: str) -> str:
+    """
+    Approximate registrable domain used to tell first-party from third-party hosts
+    ('cdn.example.com' -> 'example.com'). IPs and single-label hosts are kept whole.
+    """
+    host = (urlparse(url).hostname or '').lower()
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    # Keep three labels for common two-part public suffixes such as co.uk / com.au
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in ('co', 'com', 'net', 'org', 'ac', 'gov'):
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+def content_type(headers) -> str:
+    return (headers.get('Content-Type') or headers.get('content-type') or '').split(';')[0].strip().lower()
+
+def is_accepted(ctype: str, accept: tuple | None) -> bool:
+    # Servers that omit Content-Type get the benefit of the doubt
+    if not accept or not ctype:
+        return True
+    return any(ctype.startswith(a) for a in accept)
+
+def stream_get(url: str, timeout: float = 15, headers: dict | None = None,
+               max_bytes: int = MAX_BODY_BYTES, accept: tuple | None = None,
+               session: requests.Session | None = None, allow_redirects: bool = True,
+               max_seconds: float | None = None) -> dict:
+    """
+    GET a URL without ever holding more than max_bytes of (decoded) body in memory.
+    The body is decompressed incrementally as it streams, so a gzip bomb is capped the
+    same way as an endless stream. If the Content-Type is not in `accept`, the
+    connection is dropped right after the headers and 'rejected' is set.
+    `timeout` bounds each socket wait; `max_seconds` bounds the whole body download
+    (a slow drip is cut off and marked truncated).
+    """
+    start = time.monotonic()
+    req_headers = {'User-Agent': USER_AGENT}
+    req_headers.update(headers or {})
+    getter = session.get if session is not None else requests.get
+
+    with getter(url, timeout=timeout, headers=req_headers, allow_redirects=allow_redirects, stream=True) as r:
+        ctype = content_type(r.headers)
+        result = {
+            'finalUrl': r.url,
+            'statusCode': r.status_code,
+            'headers': dict(r.headers),
+            'contentType': ctype,
+            'history': [h.url for h in r.history],
+            'text': '',
+            'bytesRead': 0,
+            'truncated': False,
+            'rejected': False,
+        }
+        if not is_accepted(ctype, accept):
+            result['rejected'] = True
+            return result
+
+        chunks, size = [], 0
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            if size + len(chunk) > max_bytes:
+                chunks.append(chunk[:max_bytes - size])
+                size = max_bytes
+                result['truncated'] = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_seconds is not None and time.monotonic() - start > max_seconds:
+                result['truncated'] = True
+                break
+
+        result['bytesRead'] = size
+        result['text'] = b''.join(chunks).decode(r.encoding or 'utf-8', errors='replace')
+        return result
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python http_fetch.py <url> [max_bytes]")
+        sys.exit(1)
+
+    cap = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_BODY_BYTES
+    res = stream_get(sys.argv[1], max_bytes=cap)
+    res['textLength'] = len(res.pop('text'))
+    print(json.dumps(res, indent=2))
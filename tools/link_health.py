@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Tool: link_health.py
+Purpose: Broken-link checker — concurrently verify the page's internal and external links
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import http_fetch
+from url_cache import UrlCache
+
+LINK_TTL_SECONDS = 24 * 3600
+MAX_WORKERS = 32
+PER_HOST = 4                 # concurrent requests to any one host
+REQUEST_TIMEOUT = 10
+SLOW_MS = 2000               # targets slower than this are reported
+MAX_REDIRECTS = 10
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 429, 500, 501, 503}  # servers that mishandle HEAD
+
+def check_link(session, url: str, timeout: float = REQUEST_TIMEOUT) -> dict:
+    """
+    HEAD the URL (following redirects); if the server rejects HEAD or the request fails,
+    confirm with a streamed GET that is closed right after the headers.
+    """
+    info = {'status': None, 'finalUrl': None, 'redirects': [], 'elapsedMs': None, 'method': 'head'}
+    start = time.monotonic()
+    r, timed_out = None, False
+    try:
+        r = session.head(url, timeout=timeout, allow_redirects=True)
+    except requests.Timeout as e:
+        info['error'], timed_out = str(e), True
+    except Exception as e:
+        info['error'] = str(e)
+    # A GET after a timed-out HEAD would only double the wait
+    if (r is None and not timed_out) or (r is not None and r.status_code in HEAD_FALLBACK_STATUSES):
+        try:
+            with session.get(url, timeout=timeout, allow_redirects=True, stream=True) as g:
+                r = g
+            info['method'] = 'get'
+            info.pop('error', None)
+        except Exception as e:
+            info['error'] = str(e)
+    if r is not None:
+        info['status'] = r.status_code
+        info['finalUrl'] = r.url
+        info['redirects'] = [{'url': h.url, 'status': h.status_code} for h in r.history]
+    info['elapsedMs'] = int((time.monotonic() - start) * 1000)
+    return info
+
+def collect_links(raw: dict) -> dict:
+    """Map unique absolute link (fragment stripped) → 'internal' | 'external'."""
+    links = raw.get('links') or {}
+    out = {}
+    for kind in ('internal', 'external'):
+        for href in links.get(kind, []):
+            url = urldefrag(href)[0]
+            if url.startswith(('http://', 'https://')):
+                out.setdefault(url, kind)
+    return out
+
+def _interleave_by_host(urls: list[str]) -> list[str]:
+    """Round-robin across hosts so workers are not all parked on one host's limit."""
+    queues = {}
+    for url in urls:
+        queues.setdefault(urlparse(url).netloc, deque()).append(url)
+    ordered = []
+    while queues:
+        for host in list(queues):
+            ordered.append(queues[host].popleft())
+            if not queues[host]:
+                del queues[host]
+    return ordered
+
+def check_many(urls: list[str], session=None, max_workers: int = MAX_WORKERS, per_host: int = PER_HOST,
+               timeout: float = REQUEST_TIMEOUT) -> dict:
+    if session is None:
+        # Only on a session made here; requests has no per-request redirect limit
+        session = http_fetch.new_session(max_workers)
+        session.max_redirects = MAX_REDIRECTS
+    limits, guard = {}, threading.Lock()
+
+    def run(url):
+        host = urlparse(url).netloc
+        with guard:
+            sem = limits.setdefault(host, threading.BoundedSemaphore(per_host))
+        with sem:
+            return url, check_link(session, url, timeout)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(run, _interleave_by_host(urls)))
+
+def _is_broken(info: dict) -> bool:
+    return info['status'] is None or info['status'] >= 400
+
+def _results(links: dict, session, cache: UrlCache, max_workers: int, timeout: float | None) -> tuple[dict, int]:
+    results = cache.get_many(links)
+    cache_hits = len(results)
+
+    missing = [u for u in links if u not in results]
+    if missing:
+        per_request = min(REQUEST_TIMEOUT, timeout) if timeout else REQUEST_TIMEOUT
+        fetched = check_many(missing, session, max_workers, timeout=per_request)
+        # Network errors and 5xx are often transient; only cache definitive answers
+        cache.set_many({u: info for u, info in fetched.items()
+                        if info['status'] is not None and info['status'] < 500})
+        results.update(fetched)
+    return results, cache_hits
+
+def audit(raw: dict, session=None, cache: UrlCache | None = None, max_workers: int = MAX_WORKERS,
+          timeout: float | None = None) -> dict:
+    links = collect_links(raw)
+    if cache is None:
+        with UrlCache('link_health', LINK_TTL_SECONDS) as own_cache:
+            results, cache_hits = _results(links, session, own_cache, max_workers, timeout)
+    else:
+        results, cache_hits = _results(links, session, cache, max_workers, timeout)
+
+    broken, redirected, slow = [], [], []
+    by_status = {}
+    for url, kind in links.items():
+        info = results[url]
+        bucket = f"{info['status'] // 100}xx" if info['status'] else 'error'
+        by_status[bucket] = by_status.get(bucket, 0) + 1
+        if _is_broken(info):
+            broken.append({'url': url, 'type': kind, 'status': info['status'], 'error': info.get('error')})
+        elif info['redirects']:
+            redirected.append({'url': url, 'type': kind, 'finalUrl': info['finalUrl'],
+                               'hops': len(info['redirects']), 'chain': info['redirects']})
+        if info['elapsedMs'] is not None and info['elapsedMs'] > SLOW_MS:
+            slow.append({'url': url, 'type': kind, 'elapsedMs': info['elapsedMs']})
+
+    issues = []
+    internal_broken = [b for b in broken if b['type'] == 'internal']
+    external_broken = [b for b in broken if b['type'] == 'external']
+    if internal_broken:
+        issues.append({'severity': 'critical', 'check': 'Broken Links',
+                       'detail': f'{len(internal_broken)} broken internal link(s), e.g. {internal_broken[0]["url"]}'})
+    if external_broken:
+        issues.append({'severity': 'warning', 'check': 'Broken Links',
+                       'detail': f'{len(external_broken)} broken external link(s), e.g. {external_broken[0]["url"]}'})
+    chains = [r for r in redirected if r['hops'] > 1]
+    if chains:
+        issues.append({'severity': 'warning', 'check': 'Redirect Chains',
+                       'detail': f'{len(chains)} link(s) go through 2+ redirects, e.g. {chains[0]["url"]}'})
+    if slow:
+        issues.append({'severity': 'info', 'check': 'Slow Links',
+                       'detail': f'{len(slow)} link target(s) took over {SLOW_MS} ms to respond'})
+    fixes = {
+        'Broken Links': 'Fix or remove links that return 4xx/5xx or fail to connect',
+        'Redirect Chains': 'Point links straight at the final URL instead of through redirects',
+        'Slow Links': 'Check slow link targets; consider linking to faster alternatives',
+    }
+    recommendations = [{
+        'priority': {'critical': 'critical', 'warning': 'high'}.get(i['severity'], 'low'),
+        'category': 'seo', 'issue': i['detail'], 'fix': fixes[i['check']],
+    } for i in issues]
+
+    return {
+        'checked': len(links),
+        'cacheHits': cache_hits,
+        'byStatus': by_status,
+        'broken': broken,
+        'redirected': redirected,
+        'slow': sorted(slow, key=lambda s: s['elapsedMs'], reverse=True),
+        'issues': issues,
+        'recommendations': recommendations,
+    }
+
+# ── LOCAL STUB SERVER ────────────────────────────────────
+
+# path → (status check_link must report, where audit must file the link)
+STUB_EXPECTED = {
+    '/ok': (200, 'ok'),
+    '/missing': (404, 'broken'),
+    '/error': (500, 'broken'),
+    '/redirect': (200, 'redirected'),
+    '/chain': (200, 'redirected'),
+    '/slow': (200, 'slow'),
+    '/no-head': (200, 'ok'),
+}
+STUB_UNREACHABLE = 'http://127.0.0.1:9/unreachable'   # discard port: connection refused
+
+def serve_stub(port: int = 0):
+    """
+    Start a local server with known link outcomes, for trying the checker offline:
+    /ok, /missing (404), /error (500), /redirect (1 hop), /chain (3 hops),
+    /slow (SLOW_MS + 500 ms), /no-head (405 on HEAD, 200 on GET).
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, body: bool):
+            path = self.path.split('?')[0]
+            if path == '/no-head' and not body:
+                return self._send(405, body)
+            if path.startswith('/chain'):
+                n = int(path[len('/chain'):] or 3)
+                return self._send(301, body, location='/ok' if n <= 1 else f'/chain{n - 1}')
+            if path == '/redirect':
+                return self._send(302, body, location='/ok')
+            if path == '/slow':
+                time.sleep((SLOW_MS + 500) / 1000)
+            status = {'/missing': 404, '/error': 500}.get(path, 200)
+            self._send(status, body)
+
+        def _send(self, status: int, body: bool, location: str | None = None):
+            payload = b'<html><body>stub</body></html>'
+            self.send_response(status)
+            if location:
+                self.send_header('Location', location)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            if body:
+                self.wfile.write(payload)
+
+        def do_HEAD(self):
+            self._respond(body=False)
+
+        def do_GET(self):
+            self._respond(body=True)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def _category(url: str, result: dict) -> str:
+    for category in ('broken', 'redirected', 'slow'):
+        if any(entry['url'] == url for entry in result[category]):
+            return category
+    return 'ok'
+
+def check_stub() -> dict:
+    """Check every stub path and compare with STUB_EXPECTED; also audit them all as one page."""
+    server, base = serve_stub()
+    try:
+        expected = {base + p: want for p, want in STUB_EXPECTED.items()}
+        expected[STUB_UNREACHABLE] = (None, 'broken')
+        raw = {'links': {'internal': [base + p for p in STUB_EXPECTED], 'external': [STUB_UNREACHABLE]}}
+        # An in-memory cache so the stub's answers never land in the shared one
+        with UrlCache('link_health_stub', 0, path=':memory:') as cache:
+            infos, _ = _results(collect_links(raw), None, cache, MAX_WORKERS, None)
+            result = audit(raw, cache=cache)
+        checks = []
+        for url, (want_status, want_category) in expected.items():
+            status, category = infos[url]['status'], _category(url, result)
+            checks.append({'url': url, 'status': status, 'category': category,
+                           'ok': (status, category) == (want_status, want_category)})
+        chains = [i['detail'] for i in result['issues'] if i['check'] == 'Redirect Chains']
+        checks.append({'url': '(audit redirect chains)', 'issues': chains,
+                       'ok': len(chains) == 1 and base + '/chain' in chains[0]})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {'ok': all(c['ok'] for c in checks), 'checks': checks}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python link_health.py <path_to_raw> | --stub")
+        sys.exit(1)
+
+    if sys.argv[1] == '--stub':
+        report = check_stub()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['ok'] else 1)
+
+    import storage
+    result = audit(storage.load_raw(sys.argv[1]))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Tool: loadtest.py
+Purpose: Offline load test — drive the pipeline against stub origin sites and a stub Groq endpoint
+Layer: B.L.A.S.T. Navigation Layer
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import random
+import resource
+import argparse
+import threading
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analyzers
+
+JOBS = 50
+CONCURRENCY = 10
+PAGE_KB = (20, 200)           # synthetic page size range, KB
+ORIGIN_LATENCY_MS = (50, 300) # time to first byte range, per site
+LLM_LATENCY_MS = 1500
+LLM_429_RATE = 0.0
+LLM_MALFORMED_RATE = 0.0
+LLM_STREAM_CHUNK = 16         # characters per streamed delta
+PERCENTILES = (50, 95, 99)
+
+# Fingerprints a synthetic site can carry: (html snippet, extra response headers)
+MARKERS = {
+    'wordpress': ('<meta name="generator" content="WordPress 6.4.2">'
+                  '<link rel="stylesheet" href="/wp-content/themes/site/style.css">',
+                  {'X-Powered-By': 'PHP/8.2.7', 'Server': 'Apache'}),
+    'nextjs': ('<script id="__NEXT_DATA__" type="application/json">{"props":{}}</script>'
+               '<script src="/_next/static/chunks/main.js"></script>',
+               {'X-Powered-By': 'Next.js', 'Server': 'Vercel'}),
+    'shopify': ('<script src="https://cdn.shopify.com/s/trekkie.storefront.js"></script>'
+                '<script>window.Shopify = {};</script>', {'Server': 'cloudflare'}),
+    'react': ('<div id="root" data-reactroot=""></div><script src="/static/js/react.production.min.js"></script>',
+              {'Server': 'nginx'}),
+    'ga4': ("<script async src=\"https://www.googletagmanager.com/gtag/js?id=G-ABC1234567\"></script>"
+            "<script>gtag('config', 'G-ABC1234567');</script>", {}),
+    'meta-pixel': ("<script src=\"https://connect.facebook.net/en_US/fbevents.js\"></script>"
+                   "<script>fbq('init', '1234567890');</script>", {}),
+    'adsense': ('<script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js"></script>'
+                '<ins class="adsbygoogle"></ins>', {}),
+}
+
+_FILLER = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor '
+           'incididunt ut labore et dolore magna aliqua. ')
+
+# ── STUB SERVER ──────────────────────────────────────────
+
+def site_spec(i: int, sizes: tuple = PAGE_KB, latencies: tuple = ORIGIN_LATENCY_MS,
+              markers: tuple = tuple(MARKERS)) -> dict:
+    """Deterministic per-site shape, so two runs with the same flags serve the same sites."""
+    rng = random.Random(i)
+    return {
+        'sizeKb': rng.randint(*sizes),
+        'latencyMs': rng.randint(*latencies),
+        'markers': [markers[i % len(markers)], markers[(i * 7 + 3) % len(markers)]] if markers else [],
+    }
+
+def site_html(i: int, spec: dict) -> bytes:
+    snippets = ''.join(MARKERS[m][0] for m in dict.fromkeys(spec['markers']))
+    links = ''.join(f'<a href="/site/{(i + k) % 97}/">Related {k}</a>' for k in range(1, 6))
+    images = '<img src="/static/hero.png" alt="Hero"><img src="/static/logo.png">'
+    head = (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+            f'<title>Synthetic site {i} — load test</title>'
+            f'<meta name="description" content="Synthetic page {i} served by the local load-test harness.">'
+            f'<meta name="viewport" content="width=device-width, initial-scale=1">'
+            f'<link rel="canonical" href="/site/{i}/">{snippets}</head>'
+            f'<body><h1>Synthetic site {i}</h1><nav>{links}</nav>{images}')
+    filler = max(spec['sizeKb'] * 1024 - len(head) - 20, 0)
+    body = ''.join(f'<p>{_FILLER}</p>' for _ in range(filler // (len(_FILLER) + 7) + 1))
+    return (head + body + '</body></html>').encode()
+
+def llm_content(prompt: str) -> str:
+    """A schema-valid analysis; echoes the analyzed URL so responses differ per site."""
+    url = prompt.split('\n', 1)[0].rsplit(' ', 1)[-1]
+    return json.dumps({
+        'aiSummary': f'Stub analysis of {url}. The page loads, has a title and a description, '
+                     'and carries the expected tracking tags.',
+        'aiRecommendations': [
+            {'priority': p, 'category': c, 'issue': f'Stub {p} {c} issue', 'fix': f'Stub {c} fix'}
+            for p, c in (('high', 'seo'), ('medium', 'performance'), ('low', 'tech'))
+        ],
+        'competitiveSummary': 'Stub competitive summary.',
+    })
+
+# The ways real completions come back broken, with the finish_reason each arrives with;
+# the stub serves these at --llm-malformed
+MALFORMED = (
+    (lambda c: f'```json\n{c}\n```', 'stop'),                # markdown fences
+    (lambda c: c.replace('}]', '},]', 1), 'stop'),           # trailing comma
+    (lambda c: f'Here is the analysis:\n{c}\nLet me know if you need more.', 'stop'),  # prose around it
+    (lambda c: c[:int(len(c) * 0.8)], 'length'),             # cut off (max_tokens reached)
+)
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, config: dict):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.config = config
+        self.stats = {'origin': 0, 'llm': 0, 'llm429': 0, 'llmMalformed': 0}
+        self.lock = threading.Lock()
+        self.rng = random.Random(0)
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.stats[key] += 1
+
+    def handle_error(self, request, client_address):
+        # Deadline runs hang up on slow origins mid-response; that is expected, not an error
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    /site/<i>/              synthetic page (size, latency and markers from site_spec)
+    /robots.txt, /sitemap.xml
+    /static/*               small assets, so asset and link checks have something to hit
+    /openai/v1/chat/completions   Groq/OpenAI-compatible stub with latency, 429s, malformed
+                                  output and SSE streaming (stream=true)
+    """
+
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None, include_body: bool = True):
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def _origin(self, include_body: bool):
+        self.server.count('origin')
+        cfg = self.server.config
+        path = self.path.split('?')[0]
+        if path == '/robots.txt':
+            return self._send(200, b'User-agent: *\nAllow: /\nSitemap: /sitemap.xml\n', 'text/plain', include_body=include_body)
+        if path == '/sitemap.xml':
+            urls = ''.join(f'<url><loc>/site/{i}/</loc></url>' for i in range(cfg['sites']))
+            body = f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+            return self._send(200, body.encode(), 'application/xml', include_body=include_body)
+        if path.startswith('/static/') or path.startswith('/wp-content/') or path.startswith('/_next/'):
+            return self._send(200, b'/* stub asset */' * 64, 'application/javascript', include_body=include_body)
+        parts = path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'site' and parts[1].isdigit():
+            i = int(parts[1])
+            spec = site_spec(i, cfg['sizes'], cfg['latencies'], cfg['markers'])
+            time.sleep(spec['latencyMs'] / 1000)
+            headers = {}
+            for m in spec['markers']:
+                headers.update(MARKERS[m][1])
+            return self._send(200, site_html(i, spec), 'text/html; charset=utf-8', headers, include_body)
+        self._send(404, b'not found', 'text/plain', include_body=include_body)
+
+    def _llm(self):
+        self.server.count('llm')
+        cfg = self.server.config
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        with self.server.lock:
+            throttled = self.server.rng.random() < cfg['llm429']
+            malformed = self.server.rng.choice(MALFORMED) if self.server.rng.random() < cfg['llmMalformed'] else None
+        if throttled:
+            self.server.count('llm429')
+            body = json.dumps({'error': {'message': 'Rate limit reached', 'type': 'tokens', 'code': 'rate_limit_exceeded'}})
+            return self._send(429, body.encode(), 'application/json', {'Retry-After': '1'})
+        prompt = next((m['content'] for m in request.get('messages', []) if m.get('role') == 'user'), '')
+        content = llm_content(prompt)
+        finish = 'stop'
+        if malformed:
+            self.server.count('llmMalformed')
+            transform, finish = malformed
+            content = transform(content)
+        completion_id, model = f'chatcmpl-stub-{time.monotonic_ns()}', request.get('model', 'stub')
+        if request.get('stream'):
+            return self._llm_stream(completion_id, model, content, cfg['llmLatencyMs'] / 1000, finish)
+        time.sleep(cfg['llmLatencyMs'] / 1000)
+        body = json.dumps({
+            'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'finish_reason': finish,
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 300, 'total_tokens': len(prompt) // 4 + 300},
+        })
+        self._send(200, body.encode(), 'application/json')
+
+    def _llm_stream(self, completion_id: str, model: str, content: str, seconds: float, finish: str = 'stop'):
+        """Server-sent events, the completion's latency spread evenly over its deltas."""
+        pieces = [content[i:i + LLM_STREAM_CHUNK] for i in range(0, len(content), LLM_STREAM_CHUNK)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        def event(delta: dict, finish: str | None = None):
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish}]}
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+
+        event({'role': 'assistant', 'content': ''})
+        for piece in pieces:
+            time.sleep(seconds / len(pieces))
+            event({'content': piece})
+        event({}, finish)
+        self.wfile.write(b'data: [DONE]\n\n')
+
+    def do_GET(self):
+        self._origin(include_body=True)
+
+    def do_HEAD(self):
+        self._origin(include_body=False)
+
+    def do_POST(self):
+        if self.path.split('?')[0] == '/openai/v1/chat/completions':
+            return self._llm()
+        self._send(404, b'not found', 'text/plain')
+
+    def log_message(self, *args):
+        pass
+
+def serve(config: dict) -> tuple[StubServer, str]:
+    """Start the stub server on a free port; call server.shutdown() when done."""
+    server = StubServer(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+# ── MEASUREMENT ──────────────────────────────────────────
+
+def percentiles(values: list[float], qs=PERCENTILES) -> dict:
+    """Nearest-rank percentiles; empty input gives None for each."""
+    ordered = sorted(values)
+    out = {}
+    for q in qs:
+        out[f'p{q}'] = ordered[min(len(ordered) - 1, max(0, -(-q * len(ordered) // 100) - 1))] if ordered else None
+    return out
+
+def stage_memory(url: str, plan: list[str]) -> dict:
+    """
+    Run the plan once, serially, under tracemalloc: per stage, the peak Python heap above
+    where the stage started and what it still holds afterwards (its output). Allocations
+    outside the interpreter (the Playwright browser, C extensions' own pools) are not seen.
+    """
+    ctx = {'url': url, 'refresh': True}
+    out = {}
+    for name in plan:
+        analyzers.load(name)  # module import cost is not the stage's working set
+    tracemalloc.start()
+    try:
+        for name in plan:
+            spec = analyzers.ANALYZERS[name]
+            if any(k not in ctx for k in spec['inputs']):
+                continue
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            ctx[spec['output']] = analyzers.call(name, ctx)
+            current, peak = tracemalloc.get_traced_memory()
+            out[name] = {'peakKb': round((peak - before) / 1024, 1), 'retainedKb': round((current - before) / 1024, 1)}
+    finally:
+        tracemalloc.stop()
+    return out
+
+@contextlib.contextmanager
+def _stub_env(base: str, real_llm: bool):
+    """
+    Point the Groq SDK at the stub, keep paid lookups out of the run and synthetic sites
+    out of the tech index; restored afterwards.
+    """
+    saved = {k: os.environ.get(k) for k in ('GROQ_API_KEY', 'GROQ_BASE_URL', 'SIMILARWEB_API_KEY', 'SITE_INTEL_TECH_INDEX')}
+    os.environ.pop('SIMILARWEB_API_KEY', None)
+    os.environ['SITE_INTEL_TECH_INDEX'] = '0'
+    if not real_llm:
+        os.environ['GROQ_API_KEY'] = 'stub'
+        os.environ['GROQ_BASE_URL'] = base
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+def _cleanup(urls: list[str], result_ids: list[str]) -> None:
+    """
+    Remove everything the run left in .tmp (raw scrapes and their blobs, results, the
+    stub site's near-duplicate index and stored analyses, lock files and abandon marks),
+    so cohort benchmarks never count synthetic sites.
+    """
+    import storage
+    import near_dup
+    from url_cache import UrlCache
+    from scrape_url import get_cache_path
+    from run_pipeline import TMP_DIR
+    raws = [get_cache_path(u) for u in urls]
+    results = [os.path.join(TMP_DIR, f'{i}_result{storage.extension()}') for i in result_ids]
+    indexes = sorted({near_dup.index_path(u) for u in urls})
+    locked_paths = raws + indexes
+    paths = (raws + [b for p in raws for b in storage.blob_paths(p)] + results + indexes +
+             [storage.lock_path(p) for p in locked_paths] + [storage.abandon_path(p) for p in locked_paths])
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+    with UrlCache('near_dup_analyses', near_dup.ANALYSIS_TTL_SECONDS) as analyses:
+        analyses.delete_many(urls)
+
+def loadtest(jobs: int = JOBS, concurrency: int = CONCURRENCY, only: list[str] | None = None,
+             extra: list[str] | None = None, sizes: tuple = PAGE_KB, latencies: tuple = ORIGIN_LATENCY_MS,
+             markers: tuple = tuple(MARKERS), llm_latency_ms: int = LLM_LATENCY_MS, llm_429: float = LLM_429_RATE,
+             llm_malformed: float = LLM_MALFORMED_RATE, deadline: float | None = None, dedupe: bool = False, memory: bool = True,
+             real_llm: bool = False, keep: bool = False) -> dict:
+    """
+    Run `jobs` pipelines (refresh on, one synthetic site each) with `concurrency` in flight
+    and report end-to-end latency percentiles, throughput, per-stage timings and memory.
+    Near-duplicate reuse is off by default: the synthetic pages are deliberately alike.
+    The run's scrapes and results are deleted afterwards unless `keep` is set.
+    """
+    from run_pipeline import run_pipeline
+
+    plan = analyzers.resolve(only, extra)
+    if 'ai' in plan and not real_llm:
+        import importlib.util
+        if importlib.util.find_spec('groq') is None:
+            print("WARN: groq not installed — the ai stage will fail fast instead of calling the stub. "
+                  "Run: pip install groq", file=sys.stderr)
+
+    config = {'sites': jobs + 1, 'sizes': sizes, 'latencies': latencies, 'markers': markers,
+              'llmLatencyMs': llm_latency_ms, 'llm429': llm_429, 'llmMalformed': llm_malformed}
+    server, base = serve(config)
+    latencies_ms, statuses, stage_ms, errors, result_ids = [], {}, {}, [], []
+    first_rec_ms, recommendations = [], []
+
+    def job(i: int):
+        start = time.monotonic()
+        first = []
+
+        def on_event(kind, value):
+            if kind == 'aiRecommendation' and not first:
+                first.append(int((time.monotonic() - start) * 1000))
+
+        try:
+            result = run_pipeline(f'{base}/site/{i}/', only=only, extra=extra, refresh=True,
+                                  dedupe=dedupe, deadline=deadline, on_event=on_event)
+        except BaseException as e:  # run_pipeline may sys.exit on bad input
+            result = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+        return int((time.monotonic() - start) * 1000), first[0] if first else None, result
+
+    try:
+        with _stub_env(base, real_llm):
+            print(f"INFO: {jobs} jobs, {concurrency} concurrent, stages: {', '.join(plan)}", file=sys.stderr)
+            started = time.monotonic()
+            # The pipeline narrates every step; silence it for the run
+            with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for elapsed, first, result in pool.map(job, range(jobs)):
+                    latencies_ms.append(elapsed)
+                    if first is not None:
+                        first_rec_ms.append(first)
+                    if 'aiRecommendations' in result:
+                        recommendations.append(len(result['aiRecommendations']))
+                    status = result.get('status', 'unknown')
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if result.get('error'):
+                        errors.append(result['error'])
+                    if result.get('id'):
+                        result_ids.append(result['id'])
+                    for name, ms in (result.get('stageTimingsMs') or {}).items():
+                        stage_ms.setdefault(name, []).append(ms)
+            wall = time.monotonic() - started
+            max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+            memory_by_stage = None
+            if memory:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    memory_by_stage = stage_memory(f'{base}/site/{jobs}/', plan)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if not keep:
+            _cleanup([f'{base}/site/{i}/' for i in range(jobs + 1)], result_ids)
+
+    stages = {}
+    for name in plan:
+        entry = dict(percentiles(stage_ms.get(name, [])), runs=len(stage_ms.get(name, [])))
+        if memory_by_stage and name in memory_by_stage:
+            entry.update(memory_by_stage[name])
+        stages[name] = entry
+
+    return {
+        'jobs': jobs,
+        'concurrency': concurrency,
+        'wallSeconds': round(wall, 2),
+        'throughput': {'perSecond': round(jobs / wall, 2) if wall else None,
+                       'perHour': int(jobs / wall * 3600) if wall else None},
+        'latencyMs': percentiles(latencies_ms),
+        'statuses': statuses,
+        'errors': sorted(set(errors))[:10],
+        'stages': stages,
+        'ai': {'firstRecommendationMs': percentiles(first_rec_ms),
+               'withRecommendations': sum(1 for n in recommendations if n),
+               'withoutRecommendations': sum(1 for n in recommendations if not n)},
+        'maxRssMb': max_rss_mb,
+        'stub': server.stats,
+    }
+
+def _scrape_times_out(url: str, throttle=None, refresh: bool = False, timeout: float | None = None):
+    """Stand-in scrape stage that gives up on its own, as requests does once its shortened timeout expires."""
+    import requests
+    raise requests.exceptions.ReadTimeout(f"stub origin (read timeout={timeout:.2f})")
+
+def check_deadline() -> dict:
+    """
+    Self-check: a deadline run must come back 'partial', not raise, when a stage fails on
+    its own. Covers a scrape stage that raises its own ReadTimeout and the slow-origin load
+    (origins slower than the whole deadline) that first surfaced it.
+    """
+    from run_pipeline import run_pipeline
+
+    checks = []
+    url = 'http://127.0.0.1:9/deadline-check/'
+    spec = analyzers.ANALYZERS['scrape']
+    analyzers.ANALYZERS['scrape'] = dict(spec, module='loadtest', func='_scrape_times_out')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run_pipeline(url, only=['scrape', 'tech'], refresh=True, dedupe=False, deadline=5.0)
+    except BaseException as e:
+        result = {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+    finally:
+        analyzers.ANALYZERS['scrape'] = spec
+    _cleanup([url], [result['id']] if result.get('id') else [])
+    reasons = {s['stage']: s['reason'] for s in result.get('skippedStages', [])}
+    checks.append({'check': 'stage timeout', 'status': result.get('status'), 'skipped': reasons,
+                   'ok': result.get('status') == 'partial' and reasons.get('scrape') == 'timeout'})
+
+    report = loadtest(jobs=6, concurrency=3, latencies=(1500, 1500), deadline=1.0, memory=False)
+    checks.append({'check': 'slow origins', 'statuses': report['statuses'], 'errors': report['errors'],
+                   'ok': 'error' not in report['statuses']})
+    return {'ok': all(c['ok'] for c in checks), 'checks': checks}
+
+def _range(value: str) -> tuple[int, int]:
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the pipeline offline against stub sites and a stub LLM')
+    parser.add_argument('--jobs', type=int, default=JOBS, help='Pipelines to run (one synthetic site each)')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--only', help='Comma-separated analyzers to run')
+    parser.add_argument('--with', dest='extra', help="Comma-separated optional analyzers to add, e.g. 'weight,links'")
+    parser.add_argument('--size-kb', default=f'{PAGE_KB[0]}-{PAGE_KB[1]}', help='Page size, KB, as N or MIN-MAX')
+    parser.add_argument('--latency-ms', default=f'{ORIGIN_LATENCY_MS[0]}-{ORIGIN_LATENCY_MS[1]}',
+                        help='Origin time to first byte, ms, as N or MIN-MAX')
+    parser.add_argument('--markers', help=f"Comma-separated tech markers to cycle through ({', '.join(MARKERS)})")
+    parser.add_argument('--llm-latency-ms', type=int, default=LLM_LATENCY_MS)
+    parser.add_argument('--llm-429', type=float, default=LLM_429_RATE, help='Share of LLM calls answered with 429 (0-1)')
+    parser.add_argument('--llm-malformed', type=float, default=LLM_MALFORMED_RATE,
+                        help='Share of LLM completions served fenced, cut off or otherwise invalid (0-1)')
+    parser.add_argument('--deadline', type=float, help='Per-pipeline deadline in seconds')
+    parser.add_argument('--dedupe', action='store_true', help='Allow near-duplicate reuse between synthetic sites')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the per-stage tracemalloc pass')
+    parser.add_argument('--real-llm', action='store_true', help='Use the real Groq API instead of the stub')
+    parser.add_argument('--keep', action='store_true', help='Keep the scrapes and results the run wrote to .tmp')
+    parser.add_argument('--check-deadline', action='store_true',
+                        help='Check that deadline runs degrade to partial when stages time out on their own')
+    args = parser.parse_args()
+
+    if args.check_deadline:
+        report = check_deadline()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['ok'] else 1)
+
+    try:
+        only = analyzers.parse_selection(args.only)
+        extra = analyzers.parse_selection(args.extra)
+        analyzers.resolve(only, extra)
+        markers = tuple(m.strip() for m in args.markers.split(',')) if args.markers else tuple(MARKERS)
+        unknown = [m for m in markers if m not in MARKERS]
+        if unknown:
+            raise ValueError(f"Unknown marker(s): {', '.join(unknown)}. Available: {', '.join(MARKERS)}")
+        sizes, latencies = _range(args.size_kb), _range(args.latency_ms)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    report = loadtest(args.jobs, args.concurrency, only, extra, sizes, latencies, markers,
+                      args.llm_latency_ms, args.llm_429, args.llm_malformed, args.deadline, args.dedupe,
+                      not args.no_memory, args.real_llm, args.keep)
+    print(json.dumps(report, indent=2))
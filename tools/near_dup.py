@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Tool: near_dup.py
+Purpose: Near-duplicate page detection — shingling, SimHash/MinHash fingerprints and a per-site LSH index
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+import hashlib
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import storage
+from url_cache import UrlCache
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+os.makedirs(TMP_DIR, exist_ok=True)
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS, ROWS = 8, 8          # 8×8 LSH bands: pairs above ~0.77 Jaccard almost always collide
+THRESHOLD = 0.85            # estimated Jaccard at which a page reuses its representative's analysis
+MAX_SHINGLES = 5000
+ANALYSIS_TTL_SECONDS = 3600  # same as the scrape cache: never reuse an analysis older than a cached scrape
+MAX_PAGES = 5000            # per site; the oldest pages are pruned first
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+def _permutations(n: int) -> list[tuple[int, int]]:
+    # Deterministic (a, b) pairs so fingerprints stay comparable across runs and machines
+    perms = []
+    for i in range(n):
+        d = hashlib.blake2b(f'site-intel-minhash-{i}'.encode(), digest_size=16).digest()
+        a = int.from_bytes(d[:8], 'big') % _MERSENNE or 1
+        b = int.from_bytes(d[8:], 'big') % _MERSENNE
+        perms.append((a, b))
+    return perms
+
+_PERMS = _permutations(NUM_PERM)
+
+def visible_text(soup) -> str:
+    """Page text without script/style/noscript/template contents."""
+    for tag in soup.find_all(('script', 'style', 'noscript', 'template')):
+        tag.extract()
+    return soup.get_text(' ')
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> set[int]:
+    words = text.lower().split()
+    if len(words) < k:
+        words = words + [''] * (k - len(words)) if words else []
+    hashes = set()
+    for i in range(max(0, len(words) - k + 1)):
+        shingle = ' '.join(words[i:i + k]).encode('utf-8', errors='replace')
+        hashes.add(int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'big'))
+        if len(hashes) >= MAX_SHINGLES:
+            break
+    return hashes
+
+def simhash(hashes: set[int]) -> int:
+    counts = [0] * 64
+    for h in hashes:
+        for bit in range(64):
+            counts[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if counts[bit] > 0)
+
+def minhash(hashes: set[int]) -> list[int]:
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS]
+
+def fingerprint(soup) -> dict:
+    """Computed during scraping from the parsed document (mutates soup: strips scripts/styles)."""
+    hashes = shingle_hashes(visible_text(soup))
+    return {'simhash': f'{simhash(hashes):016x}', 'minhash': minhash(hashes), 'shingles': len(hashes)}
+
+def jaccard(a: list[int], b: list[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+def hamming(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+def band_keys(sig: list[int]) -> list[str]:
+    return [f'{i}:' + hashlib.blake2b(repr(sig[i * ROWS:(i + 1) * ROWS]).encode(), digest_size=8).hexdigest()
+            for i in range(BANDS)]
+
+# ── PER-SITE LSH INDEX ───────────────────────────────────
+
+def index_path(url: str) -> str:
+    site = urlparse(url).netloc.replace('.', '_').replace(':', '_')
+    return os.path.join(TMP_DIR, f"{site}_lsh{storage.extension()}")
+
+class SiteIndex:
+    """
+    One index per site. The site's file holds the LSH 'bands' and 'pages', every
+    fingerprinted page (oldest first) and the representative it was grouped under.
+    The reusable stage outputs of representatives live in the shared
+    'near_dup_analyses' cache, so they expire after ANALYSIS_TTL_SECONDS and the
+    site file stays small.
+    """
+
+    def __init__(self, url: str, analyses: UrlCache | None = None, timeout: float | None = None):
+        self.path = index_path(url)
+        data = storage.read(self.path) if os.path.exists(self.path) else {}
+        self.bands = data.get('bands', {})
+        self.pages = data.get('pages', {})
+        self.analyses = analyses or UrlCache('near_dup_analyses', ANALYSIS_TTL_SECONDS, timeout=timeout)
+
+    def close(self) -> None:
+        self.analyses.close()
+
+    def __enter__(self) -> 'SiteIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def save(self) -> None:
+        storage.write(self.path, {'bands': self.bands, 'pages': self.pages})
+
+    def analysis(self, url: str) -> dict | None:
+        """A representative's stored stage outputs, or None once they have expired."""
+        return self.analyses.get(url)
+
+    def find(self, url: str, fp: dict) -> dict | None:
+        """Best representative this page is a near-duplicate of, or None."""
+        if not fp or not fp.get('shingles'):
+            return None
+        candidates = set()
+        for key in band_keys(fp['minhash']):
+            candidates.update(self.bands.get(key, ()))
+        candidates = [c for c in candidates
+                      if c != url and c in self.pages and not self.pages[c].get('representative')]
+        fresh = self.analyses.get_many(candidates)
+        best = None
+        for cand in candidates:
+            if cand not in fresh:
+                continue
+            page = self.pages[cand]
+            sim = jaccard(fp['minhash'], page['minhash'])
+            if sim >= THRESHOLD and (best is None or sim > best['similarity']):
+                best = {'representative': cand, 'similarity': round(sim, 3),
+                        'simhashDistance': hamming(fp['simhash'], page['simhash'])}
+        return best
+
+    def add(self, url: str, fp: dict, representative: str | None = None, analysis: dict | None = None) -> None:
+        """Record a page. Representatives (representative=None) also store their analysis and join the bands."""
+        self._drop(url)
+        self.pages[url] = {'minhash': fp['minhash'], 'simhash': fp['simhash'], 'representative': representative}
+        if representative is None:
+            if analysis:
+                self.analyses.set(url, analysis)
+            for key in band_keys(fp['minhash']):
+                self.bands.setdefault(key, []).append(url)
+        while len(self.pages) > MAX_PAGES:
+            self._drop(next(iter(self.pages)))
+
+    def _drop(self, url: str) -> None:
+        page = self.pages.pop(url, None)
+        if page is None or page.get('representative'):
+            return
+        for key in band_keys(page['minhash']):
+            members = self.bands.get(key, [])
+            if url in members:
+                members.remove(url)
+                if not members:
+                    del self.bands[key]
+
+    def groups(self) -> dict:
+        groups = {}
+        for url, page in self.pages.items():
+            rep = page.get('representative')
+            if rep:
+                groups.setdefault(rep, []).append(url)
+        return groups
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python near_dup.py <site_url>")
+        sys.exit(1)
+
+    with SiteIndex(sys.argv[1]) as index:
+        groups = index.groups()
+    print(json.dumps({
+        'pages': len(index.pages),
+        'representatives': len(index.pages) - sum(len(m) for m in groups.values()),
+        'groups': [{'representative': rep, 'duplicates': members} for rep, members in
+                   sorted(groups.items(), key=lambda kv: len(kv[1]), reverse=True)],
+    }, indent=2))
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Tool: page_weight.py
+Purpose: Page-weight audit — concurrently size scripts, stylesheets and images referenced by the page
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import http_fetch
+from url_cache import UrlCache
+
+ASSET_TTL_SECONDS = 7 * 24 * 3600  # versioned CDN assets rarely change
+MAX_WORKERS = 16
+REQUEST_TIMEOUT = 10
+MAX_ASSETS = 300
+TOP_N = 10
+
+MODERN_IMAGE_FORMATS = {'webp', 'avif', 'svg'}
+_EXT_FORMATS = {
+    'jpg': 'jpeg', 'jpeg': 'jpeg', 'png': 'png', 'gif': 'gif', 'bmp': 'bmp',
+    'tif': 'tiff', 'tiff': 'tiff', 'webp': 'webp', 'avif': 'avif', 'svg': 'svg',
+}
+_CONTENT_RANGE_TOTAL = re.compile(r'/\s*(\d+)\s*$')
+
+def _image_format(url: str, ctype: str | None) -> str | None:
+    if ctype and ctype.startswith('image/'):
+        fmt = ctype.split('/', 1)[1].split('+')[0]
+        return 'jpeg' if fmt == 'jpg' else fmt
+    ext = os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+    return _EXT_FORMATS.get(ext)
+
+def size_asset(session, url: str, timeout: float = REQUEST_TIMEOUT) -> dict:
+    """
+    Determine the transfer size of one asset as cheaply as possible:
+    HEAD → Content-Length, else a 1-byte ranged GET → Content-Range total,
+    else stream the (compressed) body and count it, up to the download cap.
+    """
+    info = {'bytes': None, 'contentType': None, 'status': None, 'method': None}
+    try:
+        r = session.head(url, timeout=timeout, allow_redirects=True)
+        info['status'] = r.status_code
+        info['contentType'] = http_fetch.content_type(r.headers) or None
+        length = r.headers.get('Content-Length')
+        if r.status_code < 400 and length and length.isdigit() and int(length) > 0:
+            info.update(bytes=int(length), method='head')
+            return info
+
+        with session.get(url, timeout=timeout, headers={'Range': 'bytes=0-0'}, stream=True) as g:
+            info['status'] = g.status_code
+            info['contentType'] = http_fetch.content_type(g.headers) or info['contentType']
+            if g.status_code >= 400:
+                return info
+            total = _CONTENT_RANGE_TOTAL.search(g.headers.get('Content-Range', ''))
+            if g.status_code == 206 and total:
+                info.update(bytes=int(total.group(1)), method='range')
+                return info
+            length = g.headers.get('Content-Length')
+            if g.status_code == 200 and length and length.isdigit():
+                info.update(bytes=int(length), method='get')
+                return info
+            size = 0
+            for chunk in g.raw.stream(http_fetch.CHUNK_SIZE, decode_content=False):
+                size += len(chunk)
+                if size >= http_fetch.MAX_BODY_BYTES:
+                    break
+            info.update(bytes=size, method='stream')
+    except Exception as e:
+        info['error'] = str(e)
+    return info
+
+def collect_assets(raw: dict) -> dict:
+    """Map absolute asset URL → asset type ('script' | 'stylesheet' | 'image')."""
+    base = raw.get('finalUrl') or raw.get('url', '')
+    assets = {}
+    candidates = ([('script', s) for s in raw.get('scripts', [])] +
+                  [('stylesheet', s) for s in raw.get('stylesheets', [])] +
+                  [('image', i.get('src', '')) for i in raw.get('images', [])])
+    for kind, src in candidates:
+        if not src or src.startswith('data:'):
+            continue
+        absolute = urljoin(base, src)
+        if absolute.startswith(('http://', 'https://')):
+            assets.setdefault(absolute, kind)
+        if len(assets) >= MAX_ASSETS:
+            break
+    return assets
+
+def _sizes(assets: dict, session, cache: UrlCache, max_workers: int, timeout: float | None) -> tuple[dict, int]:
+    sizes = cache.get_many(assets)
+    cache_hits = len(sizes)
+
+    missing = [u for u in assets if u not in sizes]
+    if missing:
+        session = session or http_fetch.new_session(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            per_request = min(REQUEST_TIMEOUT, timeout) if timeout else REQUEST_TIMEOUT
+            fetched = dict(zip(missing, pool.map(lambda u: size_asset(session, u, per_request), missing)))
+        # Only cache definitive answers; transient errors should be retried next run
+        cache.set_many({u: info for u, info in fetched.items() if info['bytes'] is not None})
+        sizes.update(fetched)
+    return sizes, cache_hits
+
+def audit(raw: dict, session=None, cache: UrlCache | None = None, max_workers: int = MAX_WORKERS,
+          timeout: float | None = None) -> dict:
+    assets = collect_assets(raw)
+    if cache is None:
+        with UrlCache('asset_sizes', ASSET_TTL_SECONDS) as own_cache:
+            sizes, cache_hits = _sizes(assets, session, own_cache, max_workers, timeout)
+    else:
+        sizes, cache_hits = _sizes(assets, session, cache, max_workers, timeout)
+
+    site = http_fetch.site_key(raw.get('finalUrl') or raw.get('url', ''))
+    by_type = {t: {'count': 0, 'bytes': 0} for t in ('script', 'stylesheet', 'image')}
+    third_party_bytes, third_party_hosts = 0, {}
+    sized, non_modern = [], []
+
+    for url, kind in assets.items():
+        info = sizes.get(url) or {}
+        size = info.get('bytes')
+        by_type[kind]['count'] += 1
+        if size is None:
+            continue
+        by_type[kind]['bytes'] += size
+        sized.append({'url': url, 'type': kind, 'bytes': size})
+        if http_fetch.site_key(url) != site:
+            third_party_bytes += size
+            host = urlparse(url).hostname or ''
+            third_party_hosts[host] = third_party_hosts.get(host, 0) + size
+        if kind == 'image':
+            fmt = _image_format(url, info.get('contentType'))
+            if fmt and fmt not in MODERN_IMAGE_FORMATS:
+                non_modern.append({'url': url, 'format': fmt, 'bytes': size})
+
+    total = sum(a['bytes'] for a in sized)
+    sized.sort(key=lambda a: a['bytes'], reverse=True)
+    non_modern.sort(key=lambda a: a['bytes'], reverse=True)
+    top_hosts = sorted(third_party_hosts.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N]
+
+    return {
+        'totalBytes': total,
+        'assetCount': len(assets),
+        'unsized': len(assets) - len(sized),
+        'byType': by_type,
+        'largest': sized[:TOP_N],
+        'nonModernImages': {
+            'count': len(non_modern),
+            'bytes': sum(i['bytes'] for i in non_modern),
+            'items': non_modern[:TOP_N],
+        },
+        'thirdParty': {
+            'bytes': third_party_bytes,
+            'share': round(third_party_bytes / total * 100, 1) if total else 0.0,
+            'hosts': [{'host': h, 'bytes': b} for h, b in top_hosts],
+        },
+        'cacheHits': cache_hits,
+    }
+
+# ── LOCAL STUB SERVER ────────────────────────────────────
+
+# path → (HEAD behaviour, GET behaviour, body size); STUB_EXPECTED is what size_asset must report
+STUB_ASSETS = {
+    '/head-length.js': ('length', 'full', 1234),      # HEAD carries Content-Length
+    '/ranged.png': ('no-length', 'range', 5000),      # HEAD without length → ranged GET
+    '/no-head.css': ('405', 'full', 3000),            # HEAD rejected → GET ignores Range, has length
+    '/streamed.jpg': ('no-length', 'stream', 7000),   # no length anywhere → count the body
+    '/missing.gif': ('404', '404', 0),
+}
+STUB_EXPECTED = {
+    '/head-length.js': (1234, 'head'),
+    '/ranged.png': (5000, 'range'),
+    '/no-head.css': (3000, 'get'),
+    '/streamed.jpg': (7000, 'stream'),
+    '/missing.gif': (None, None),
+}
+
+def serve_stub(port: int = 0):
+    """
+    Start a local server whose assets exercise each sizing path of size_asset (see
+    STUB_ASSETS), for checking the audit offline. Returns (server, base_url); call
+    server.shutdown() when done.
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, is_head: bool):
+            head_mode, get_mode, size = STUB_ASSETS.get(self.path.split('?')[0], ('404', '404', 0))
+            mode = head_mode if is_head else get_mode
+            if mode in ('404', '405'):
+                self.send_response(int(mode))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            ranged = (not is_head and mode == 'range' and self.headers.get('Range') == 'bytes=0-0')
+            self.send_response(206 if ranged else 200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            if ranged:
+                self.send_header('Content-Range', f'bytes 0-0/{size}')
+                self.send_header('Content-Length', '1')
+            elif mode in ('length', 'full'):
+                self.send_header('Content-Length', str(size))
+            self.end_headers()
+            if is_head:
+                return
+            # Without a Content-Length the body runs until the connection closes (HTTP/1.0)
+            self.wfile.write(b'x' if ranged else b'x' * size)
+
+        def do_HEAD(self):
+            self._respond(is_head=True)
+
+        def do_GET(self):
+            self._respond(is_head=False)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+def check_stub() -> dict:
+    """Size every stub asset and compare with STUB_EXPECTED; also run a full audit over them."""
+    server, base = serve_stub()
+    try:
+        session = http_fetch.new_session(4)
+        checks = []
+        for path, (want_bytes, want_method) in STUB_EXPECTED.items():
+            info = size_asset(session, base + path)
+            checks.append({'path': path, 'bytes': info['bytes'], 'method': info['method'],
+                           'ok': (info['bytes'], info['method']) == (want_bytes, want_method)})
+        raw = {'url': base + '/', 'scripts': [base + p for p in STUB_ASSETS if p.endswith('.js')],
+               'stylesheets': [base + p for p in STUB_ASSETS if p.endswith('.css')],
+               'images': [{'src': base + p} for p in STUB_ASSETS if p.endswith(('.png', '.jpg', '.gif'))]}
+        # An in-memory cache so the stub's answers never land in the shared one
+        with UrlCache('asset_sizes_stub', 0, path=':memory:') as cache:
+            result = audit(raw, session=session, cache=cache)
+        expected_total = sum(b for b, _ in STUB_EXPECTED.values() if b)
+        checks.append({'path': '(audit totalBytes)', 'bytes': result['totalBytes'],
+                       'ok': result['totalBytes'] == expected_total and result['unsized'] == 1})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {'ok': all(c['ok'] for c in checks), 'checks': checks}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python page_weight.py <path_to_raw> | --stub")
+        sys.exit(1)
+
+    if sys.argv[1] == '--stub':
+        report = check_stub()
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['ok'] else 1)
+
+    import storage
+    raw = storage.load_raw(sys.argv[1])
+
+    result = audit(raw)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tool: perf_metrics.py
+Purpose: In-page rendering metrics (Navigation/Resource Timing, paint, LCP, CLS), throttling profiles and scoring
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from seo_audit import grade
+
+# Network values follow Chrome DevTools / Lighthouse presets. Throughput in bytes/sec.
+THROTTLE_PROFILES = {
+    'desktop': {'latencyMs': 40, 'downloadBps': 10 * 1024 * 1024 // 8, 'uploadBps': 10 * 1024 * 1024 // 8, 'cpuSlowdown': 1},
+    'mobile': {'latencyMs': 150, 'downloadBps': 1638 * 1024 // 8, 'uploadBps': 750 * 1024 // 8, 'cpuSlowdown': 4},
+    'fast-3g': {'latencyMs': 563, 'downloadBps': 1440 * 1024 // 8, 'uploadBps': 675 * 1024 // 8, 'cpuSlowdown': 4},
+    'slow-3g': {'latencyMs': 2000, 'downloadBps': 400 * 1024 // 8, 'uploadBps': 400 * 1024 // 8, 'cpuSlowdown': 6},
+}
+
+# (good, poor) thresholds — at or below `good` is good, above `poor` is poor (web.dev Core Web Vitals)
+THRESHOLDS = {
+    'lcpMs': (2500, 4000),
+    'cls': (0.1, 0.25),
+    'fcpMs': (1800, 3000),
+    'ttfbMs': (800, 1800),
+}
+WEIGHTS = {'lcpMs': 35, 'cls': 25, 'fcpMs': 20, 'ttfbMs': 20}
+
+# Registered before any page script runs; LCP and CLS are only observable via PerformanceObserver.
+# CLS uses the session-window definition (gaps < 1s, windows capped at 5s, largest window wins).
+INIT_SCRIPT = """
+(() => {
+  const s = window.__siteIntelPerf = {lcp: null, cls: 0, _win: 0, _first: 0, _last: 0};
+  try {
+    new PerformanceObserver(list => {
+      for (const e of list.getEntries()) s.lcp = e.renderTime || e.loadTime || e.startTime;
+    }).observe({type: 'largest-contentful-paint', buffered: true});
+    new PerformanceObserver(list => {
+      for (const e of list.getEntries()) {
+        if (e.hadRecentInput) continue;
+        if (s._win && e.startTime - s._last < 1000 && e.startTime - s._first < 5000) {
+          s._win += e.value;
+        } else {
+          s._win = e.value;
+          s._first = e.startTime;
+        }
+        s._last = e.startTime;
+        s.cls = Math.max(s.cls, s._win);
+      }
+    }).observe({type: 'layout-shift', buffered: true});
+  } catch (e) {}
+})();
+"""
+
+COLLECT_SCRIPT = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0] || {};
+  const paint = {};
+  for (const p of performance.getEntriesByType('paint')) paint[p.name] = p.startTime;
+  const resources = performance.getEntriesByType('resource');
+  const byType = {};
+  let transfer = 0;
+  for (const r of resources) {
+    const t = byType[r.initiatorType] = byType[r.initiatorType] || {count: 0, transferSize: 0};
+    t.count += 1;
+    t.transferSize += r.transferSize || 0;
+    transfer += r.transferSize || 0;
+  }
+  const slowest = resources.slice().sort((a, b) => b.duration - a.duration).slice(0, 10)
+    .map(r => ({url: r.name, type: r.initiatorType, durationMs: Math.round(r.duration), transferSize: r.transferSize || 0}));
+  const s = window.__siteIntelPerf || {};
+  const round = v => (v === undefined || v === null) ? null : Math.round(v);
+  return {
+    navigation: {
+      dnsMs: round(nav.domainLookupEnd - nav.domainLookupStart),
+      connectMs: round(nav.connectEnd - nav.connectStart),
+      ttfbMs: round(nav.responseStart),
+      responseMs: round(nav.responseEnd - nav.responseStart),
+      domInteractiveMs: round(nav.domInteractive),
+      domContentLoadedMs: round(nav.domContentLoadedEventEnd),
+      loadEventMs: round(nav.loadEventEnd),
+      transferSize: nav.transferSize || 0,
+      decodedBodySize: nav.decodedBodySize || 0
+    },
+    paint: {fpMs: round(paint['first-paint']), fcpMs: round(paint['first-contentful-paint'])},
+    lcpMs: round(s.lcp),
+    cls: s.cls === undefined ? null : Math.round(s.cls * 1000) / 1000,
+    resources: {count: resources.length, transferSize: transfer, byType: byType, slowest: slowest}
+  };
+}
+"""
+
+def apply_throttle(context, page, profile: str | None) -> None:
+    """Apply a network + CPU throttling profile through the Chrome DevTools Protocol."""
+    if not profile:
+        return
+    if profile not in THROTTLE_PROFILES:
+        raise ValueError(f"Unknown throttle profile '{profile}'. Choose one of: {', '.join(THROTTLE_PROFILES)}")
+    p = THROTTLE_PROFILES[profile]
+    client = context.new_cdp_session(page)
+    client.send('Network.enable')
+    client.send('Network.emulateNetworkConditions', {
+        'offline': False,
+        'latency': p['latencyMs'],
+        'downloadThroughput': p['downloadBps'],
+        'uploadThroughput': p['uploadBps'],
+    })
+    if p['cpuSlowdown'] > 1:
+        client.send('Emulation.setCPUThrottlingRate', {'rate': p['cpuSlowdown']})
+
+def collect(page) -> dict:
+    return page.evaluate(COLLECT_SCRIPT)
+
+def _metric_score(value: float, good: float, poor: float) -> int:
+    """100 at 0, 90 at the good threshold, 50 at the poor threshold, 0 at twice the poor threshold."""
+    if value <= good:
+        return round(100 - 10 * value / good) if good else 100
+    if value <= poor:
+        return round(90 - 40 * (value - good) / (poor - good))
+    return max(0, round(50 - 50 * (value - poor) / poor))
+
+def _status(value: float, good: float, poor: float) -> str:
+    if value <= good:
+        return 'good'
+    return 'needs-improvement' if value <= poor else 'poor'
+
+def score(raw: dict) -> dict:
+    perf = raw.get('performance')
+    if not perf:
+        return {
+            'available': False,
+            'reason': 'Rendering metrics require a Playwright scrape',
+            'loadTimeMs': raw.get('loadTimeMs'),
+            'navigationMs': raw.get('navigationMs'),
+        }
+
+    values = {
+        'lcpMs': perf.get('lcpMs'),
+        'cls': perf.get('cls'),
+        'fcpMs': (perf.get('paint') or {}).get('fcpMs'),
+        'ttfbMs': (perf.get('navigation') or {}).get('ttfbMs'),
+    }
+    metrics, weighted, weight_total = {}, 0, 0
+    for key, value in values.items():
+        good, poor = THRESHOLDS[key]
+        if value is None:
+            metrics[key] = {'value': None, 'status': 'unavailable', 'score': None}
+            continue
+        s = _metric_score(value, good, poor)
+        metrics[key] = {'value': value, 'status': _status(value, good, poor), 'score': s}
+        weighted += s * WEIGHTS[key]
+        weight_total += WEIGHTS[key]
+
+    overall = round(weighted / weight_total) if weight_total else None
+    issues = [
+        {'severity': 'critical' if m['status'] == 'poor' else 'warning', 'check': key,
+         'detail': f"{key} is {m['value']} ({m['status']}; good ≤ {THRESHOLDS[key][0]})"}
+        for key, m in metrics.items() if m['status'] in ('poor', 'needs-improvement')
+    ]
+
+    return {
+        'available': True,
+        'score': overall,
+        'grade': grade(overall) if overall is not None else None,
+        'throttle': perf.get('throttle'),
+        'loadTimeMs': raw.get('loadTimeMs'),
+        'navigationMs': raw.get('navigationMs'),
+        'metrics': metrics,
+        'navigation': perf.get('navigation'),
+        'paint': perf.get('paint'),
+        'resources': perf.get('resources'),
+        'issues': issues,
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python perf_metrics.py <path_to_raw>")
+        sys.exit(1)
+
+    import storage
+    raw = storage.load_raw(sys.argv[1])
+
+    result = score(raw)
+    print(json.dumps(result, indent=2))
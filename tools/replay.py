@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Tool: replay.py
+Purpose: Offline replay — re-run content analyzers over archived WARC files or stored raw payloads
+Layer: B.L.A.S.T. Navigation Layer
+"""
+
+import sys
+import os
+import glob
+import mmap
+import zlib
+import time
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analyzers
+import storage
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+
+# Stages that read only the page itself; network-bound stages (ai, weight...) never replay
+OFFLINE_STAGES = ('tech', 'seo', 'competitive', 'performance')
+DEFAULT_STAGES = ('tech', 'seo', 'competitive')
+BATCH_SIZE = 64               # records per worker task
+WRITE_BATCH = 1000            # results per bulk write
+READ_CHUNK = 1024 * 1024      # compressed bytes fed to the decompressor at a time
+BROTLI_FEED_BYTES = 4096      # brotli input per step when decoding a record body
+
+# ── WARC READER ──────────────────────────────────────────
+
+def _parse_warc_head(head: bytes) -> dict:
+    fields = {}
+    for line in head.decode('utf-8', 'replace').split('\r\n')[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            fields[name.strip().lower()] = value.strip()
+    return fields
+
+def _next_record(buf, pos: int, final: bool):
+    """
+    Parse the record starting at or after pos in buf (bytes-like with find()).
+    Returns (fields, block, next_pos), or None if the record is not complete yet.
+    """
+    start = buf.find(b'WARC/', pos)
+    if start < 0:
+        return None
+    end = buf.find(b'\r\n\r\n', start)
+    if end < 0:
+        return None
+    fields = _parse_warc_head(bytes(buf[start:end]))
+    block_start = end + 4
+    block_end = block_start + int(fields.get('content-length') or 0)
+    if block_end > len(buf) and not final:
+        return None
+    return fields, bytes(buf[block_start:block_end]), block_end
+
+def iter_warc(path: str):
+    """
+    Stream (fields, block) records from a .warc or .warc.gz file. The file is memory-mapped
+    and read sequentially: plain WARCs are sliced record by record straight from the map;
+    gzip members (one per record in standard WARCs, or one for the whole file) are inflated
+    incrementally, so memory is bounded by the largest record, not the file.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:2] != b'\x1f\x8b':
+                pos = 0
+                while (rec := _next_record(mm, pos, final=True)) is not None:
+                    yield rec[0], rec[1]
+                    pos = rec[2]
+                return
+
+            view = memoryview(mm)
+            try:
+                pos, buf = 0, bytearray()
+                while pos < len(mm):
+                    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    while not inflater.eof and pos < len(mm):
+                        with view[pos:pos + READ_CHUNK] as chunk:
+                            try:
+                                buf += inflater.decompress(chunk)
+                            except zlib.error as e:
+                                print(f"WARN: {os.path.basename(path)}: corrupt gzip member at byte {pos} ({e}) — skipping rest of file")
+                                return
+                            pos += len(chunk) - len(inflater.unused_data)
+                        consumed = 0
+                        while (rec := _next_record(buf, consumed, final=False)) is not None:
+                            yield rec[0], rec[1]
+                            consumed = rec[2]
+                        del buf[:consumed]
+                    if not inflater.eof:
+                        break  # truncated archive: keep the records that were complete
+            finally:
+                view.release()
+
+def _cookie_names(raw_headers: list[tuple[str, str]]) -> list[str]:
+    return [v.split('=', 1)[0].strip() for k, v in raw_headers if k == 'set-cookie']
+
+def _inflate(body: bytes, wbits: int, limit: int) -> bytes:
+    return zlib.decompressobj(wbits).decompress(body, limit)
+
+def _decode_body(body: bytes, headers: dict, limit: int) -> bytes:
+    """
+    Undo transfer and content encodings, producing at most `limit` bytes: a small
+    compressed record must not inflate into gigabytes.
+    """
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        from triage import dechunk
+        body = dechunk(body)
+    encoding = headers.get('content-encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip'):
+        body = _inflate(body, 16 + zlib.MAX_WBITS, limit)
+    elif encoding == 'deflate':
+        try:
+            body = _inflate(body, zlib.MAX_WBITS, limit)
+        except zlib.error:
+            body = _inflate(body, -zlib.MAX_WBITS, limit)
+    elif encoding == 'br':
+        import brotli  # optional; raises ImportError → record is skipped
+        # No output cap in the brotli API: feed small slices and stop once past the limit
+        decoder, out = brotli.Decompressor(), bytearray()
+        for i in range(0, len(body), BROTLI_FEED_BYTES):
+            out += decoder.process(body[i:i + BROTLI_FEED_BYTES])
+            if len(out) >= limit:
+                break
+        body = bytes(out)
+    return body[:limit]
+
+def warc_payload(fields: dict, block: bytes) -> dict | None:
+    """Rebuild a raw scrape payload from a WARC response record; None for non-HTML records."""
+    import http_fetch
+    from scrape_url import parse_html
+
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ', 2)
+    raw_headers = []
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            raw_headers.append((name.strip().lower(), value.strip()))
+    headers = {}
+    for name, value in raw_headers:
+        headers[name] = f'{headers[name]}, {value}' if name in headers else value
+
+    ctype = http_fetch.content_type(headers)
+    if not ctype or not http_fetch.is_accepted(ctype, http_fetch.HTML_TYPES):
+        return None
+    # One byte over the cap is enough to tell the record was truncated
+    body = _decode_body(body, headers, http_fetch.MAX_BODY_BYTES + 1)
+    truncated = len(body) > http_fetch.MAX_BODY_BYTES
+    html = body[:http_fetch.MAX_BODY_BYTES].decode('utf-8', errors='replace')
+    url = fields.get('warc-target-uri', '').strip('<>')
+
+    return {
+        'url': url,
+        'finalUrl': url,
+        'timestamp': fields.get('warc-date'),
+        'statusCode': int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0,
+        'loadTimeMs': None,
+        'html': html,
+        'headers': headers,
+        **parse_html(html, url),
+        'cookies': _cookie_names(raw_headers),
+        'robots': None,
+        'sitemap': None,
+        'contentType': ctype,
+        'bytesRead': min(len(body), http_fetch.MAX_BODY_BYTES),
+        'truncated': ['html'] if truncated else [],
+        'scrapeMethod': 'warc',
+    }
+
+# ── SOURCES ──────────────────────────────────────────────
+
+def iter_sources(inputs: list[str]):
+    """
+    Yield work items from WARC files and raw-payload directories:
+    ('warc', source, fields, block) or ('raw', path).
+    """
+    for target in inputs:
+        if os.path.isdir(target):
+            paths = sorted(glob.glob(os.path.join(target, '*_raw.json')) +
+                           glob.glob(os.path.join(target, '*_raw.msgpack')))
+            for path in paths:
+                yield ('raw', path)
+            for path in sorted(glob.glob(os.path.join(target, '*.warc')) + glob.glob(os.path.join(target, '*.warc.gz'))):
+                yield from iter_sources([path])
+            continue
+        name = os.path.basename(target)
+        for n, (fields, block) in enumerate(iter_warc(target)):
+            if fields.get('warc-type') != 'response' or 'msgtype=response' not in fields.get('content-type', ''):
+                continue
+            record_id = fields.get('warc-record-id', '').strip('<>') or f'#{n}'
+            yield ('warc', f'{name}:{record_id}', fields, block)
+
+# ── WORKERS ──────────────────────────────────────────────
+
+def _init_worker() -> None:
+    # Replays must be reproducible and offline: no paid traffic lookups
+    os.environ.pop('SIMILARWEB_API_KEY', None)
+    sys.stdout = open(os.devnull, 'w')
+
+def _analyze(item: tuple, stages: tuple) -> dict | None:
+    if item[0] == 'raw':
+        source = os.path.basename(item[1])
+        raw = storage.load_raw(item[1])
+        if raw.get('rejected') or raw.get('blocked'):
+            return None
+    else:
+        source = item[1]
+        raw = warc_payload(item[2], item[3])
+        if raw is None:
+            return None
+
+    url = raw.get('url') or ''
+    ctx = {'url': url, 'raw': raw}
+    for name in stages:
+        ctx[analyzers.ANALYZERS[name]['output']] = analyzers.call(name, ctx)
+
+    from run_pipeline import assemble
+    # Same record → same id, so repeated replays diff cleanly
+    analysis_id = hashlib.sha1(f'{source}|{url}'.encode()).hexdigest()[:8]
+    result = assemble(analysis_id, url, ctx)
+    result['source'] = source
+    return result
+
+def analyze_batch(items: list[tuple], stages: tuple) -> list[dict]:
+    results = []
+    for item in items:
+        try:
+            result = _analyze(item, stages)
+        except Exception as e:
+            source = item[1] if item[0] == 'warc' else os.path.basename(item[1])
+            result = {'source': source, 'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+        if result is not None:
+            results.append(result)
+    return results
+
+def _batches(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def replay(inputs: list[str], out_path: str, stages: tuple = DEFAULT_STAGES, workers: int | None = None,
+           index_path: str | None = None) -> dict:
+    """
+    Fan records out to analyzer processes and append results to out_path as JSON lines,
+    in input order, WRITE_BATCH at a time. In-flight work is bounded so memory stays flat.
+    """
+    workers = workers or os.cpu_count() or 2
+    index = None
+    if index_path:
+        from tech_index import TechIndex
+        index = TechIndex(index_path)
+
+    stats = {'records': 0, 'results': 0, 'errors': 0}
+    start = time.monotonic()
+    pending, buffered = deque(), []
+
+    def flush(out, final=False):
+        if not buffered or (len(buffered) < WRITE_BATCH and not final):
+            return
+        out.write(b''.join(storage.dumps(r, 'json') + b'\n' for r in buffered))
+        if index is not None:
+            index.update_many([r for r in buffered if r.get('status') == 'done'])
+        buffered.clear()
+
+    def drain(out, block_until: int):
+        while len(pending) > block_until:
+            for result in pending.popleft().result():
+                stats['results'] += 1
+                stats['errors'] += result.get('status') == 'error'
+                buffered.append(result)
+            flush(out)
+
+    with open(out_path, 'wb') as out, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for batch in _batches(iter_sources(inputs), BATCH_SIZE):
+            stats['records'] += len(batch)
+            pending.append(pool.submit(analyze_batch, batch, stages))
+            drain(out, workers * 4)
+        drain(out, 0)
+        flush(out, final=True)
+
+    if index is not None:
+        index.close()
+    elapsed = time.monotonic() - start
+    stats['elapsedSeconds'] = round(elapsed, 2)
+    stats['perHour'] = int(stats['records'] / elapsed * 3600) if elapsed else None
+    stats['output'] = out_path
+    return stats
+
+if __name__ == '__main__':
+    import json
+    parser = argparse.ArgumentParser(description='Re-run content analyzers over WARC archives or stored raw payloads')
+    parser.add_argument('inputs', nargs='+', help='.warc / .warc.gz files, or directories of *_raw payloads')
+    parser.add_argument('--only', help=f"Comma-separated stages ({', '.join(OFFLINE_STAGES)}); "
+                                       f"default: {','.join(DEFAULT_STAGES)}")
+    parser.add_argument('--out', default=os.path.join(TMP_DIR, 'replay_results.jsonl'))
+    parser.add_argument('--workers', type=int, help='Analyzer processes (default: CPU count)')
+    parser.add_argument('--index', help='Also fold results into a tech index at this SQLite path')
+    args = parser.parse_args()
+
+    try:
+        selected = analyzers.parse_selection(args.only) or list(DEFAULT_STAGES)
+        stages = tuple(n for n in analyzers.resolve(selected) if n != 'scrape')
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    online = [n for n in stages if n not in OFFLINE_STAGES]
+    if online:
+        print(f"ERROR: {', '.join(online)} need the network and cannot be replayed. Choose from: {', '.join(OFFLINE_STAGES)}")
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    print(json.dumps(replay(args.inputs, args.out, stages, args.workers, args.index), indent=2))
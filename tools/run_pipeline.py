@@ -8,89 +8,287 @@ Layer: B.L.A.S.T. Navigation Layer
 import sys
 import json
 import os
+import time
 import uuid
+import argparse
+import threading
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-import scrape_url
-import detect_tech
-import seo_audit
-import detect_competitive
-import ai_analyze
+import analyzers
+import storage
 
 TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
 os.makedirs(TMP_DIR, exist_ok=True)
 
-def run_pipeline(url: str) -> dict:
+class StageTimeout(Exception):
+    pass
+
+def _call_within(name: str, ctx: dict, seconds: float):
+    """
+    Run one stage in a daemon thread and wait at most `seconds` for it. A stage that
+    overruns is abandoned (its thread finishes in the background and its output is
+    discarded), so the pipeline's wall-clock bound holds even for uncooperative code.
+    """
+    box = {}
+
+    def target():
+        try:
+            box['value'] = analyzers.call(name, ctx)
+        except BaseException as e:
+            box['error'] = e
+
+    thread = threading.Thread(target=target, name=f'stage-{name}', daemon=True)
+    thread.start()
+    thread.join(seconds)
+    if thread.is_alive():
+        raise StageTimeout(name)
+    if 'error' in box:
+        raise box['error']
+    return box['value']
+
+def _is_timeout(e: Exception) -> bool:
+    """Socket, requests/urllib3 and SDK timeouts, which share no common base class."""
+    return isinstance(e, TimeoutError) or any('Timeout' in cls.__name__ for cls in type(e).__mro__)
+
+def _stage_budget(name: str, pending: list[str], reserved: dict, deadline_at: float) -> float:
+    """
+    Seconds this stage may use: all time not reserved for the stages after it, but never
+    less than its proportional share of what is left. Time saved by fast stages flows on.
+    """
+    remaining = deadline_at - time.monotonic()
+    later = sum(reserved[n] for n in pending if n != name)
+    share = remaining * reserved[name] / (reserved[name] + later) if reserved[name] + later else remaining
+    return max(remaining - later, share)
+
+def run_pipeline(url: str, only: list[str] | None = None, extra: list[str] | None = None,
+                 throttle: str | None = None, refresh: bool = False, dedupe: bool = True,
+                 deadline: float | None = None, on_event=None) -> dict:
+    """
+    Run the planned stages on a URL. With `deadline` (seconds), the total is split into
+    per-stage budgets (analyzers 'cost'); stages that run out of time or fail on their own are
+    skipped along with everything that depends on them, and the report comes back with status 'partial'.
+    `on_event(kind, value)` receives the AI summary and recommendations as they stream in.
+    """
     print(f"\n{'='*50}")
     print(f"🚀 Site Intel Pipeline — {url}")
     print(f"{'='*50}\n")
 
     analysis_id = str(uuid.uuid4())[:8]
+    plan = analyzers.resolve(only, extra)
+    ctx = {'url': url, 'throttle': throttle, 'refresh': refresh, 'on_event': on_event}
+    fingerprinted, dup, reuse = False, None, {}
+    started = time.monotonic()
+    deadline_at = started + deadline if deadline else None
+    reserved = analyzers.budgets(plan, deadline) if deadline else {}
+    timings, skipped = {}, []
 
-    # ── STEP 1: SCRAPE ────────────────────────────────────
-    print("Step 1/5: 🔍 Fetching & scraping URL...")
-    raw = scrape_url.run(url)
+    for step, name in enumerate(plan, 1):
+        spec = analyzers.ANALYZERS[name]
+        print(f"Step {step}/{len(plan)}: {spec['label']}")
 
-    if raw.get('blocked'):
-        return {
-            'id': analysis_id, 'url': url, 'error': 'Site blocked scraping (bot protection)',
-            'status': 'blocked'
-        }
+        missing = [k for k in spec['inputs'] if k not in ctx]
+        if missing:
+            skipped.append({'stage': name, 'reason': f"missing input: {', '.join(missing)}"})
+            print(f"  → Skipped (missing {', '.join(missing)})")
+            continue
+
+        reused = dup and spec.get('reusable') and reuse.get(spec['output'])
+        if reused and not (isinstance(reused, dict) and reused.get('error')):
+            ctx[spec['output']] = reused
+            print(f"  → Reused from near-duplicate {dup['representative']}")
+            continue
+
+        stage_start = time.monotonic()
+        if deadline_at is None:
+            ctx[spec['output']] = analyzers.call(name, ctx)
+        else:
+            budget = _stage_budget(name, plan[step - 1:], reserved, deadline_at)
+            try:
+                if budget <= 0:
+                    raise StageTimeout(name)
+                # A copy, so an abandoned stage never sees later context changes
+                ctx[spec['output']] = _call_within(name, dict(ctx, timeout=budget), budget)
+            except StageTimeout:
+                if name == 'scrape' and budget > 0:
+                    # The abandoned thread still holds the page's single-flight lock
+                    import scrape_url
+                    scrape_url.abandon(url, throttle)
+                timings[name] = int((time.monotonic() - stage_start) * 1000)
+                skipped.append({'stage': name, 'reason': 'deadline'})
+                print(f"  → ⏱️  Skipped — out of time ({max(budget, 0):.1f}s budget)")
+                continue
+            except Exception as e:
+                # Stages get shortened timeouts, so one may give up on its own before the
+                # budget runs out; a deadline run still returns whatever completed
+                timings[name] = int((time.monotonic() - stage_start) * 1000)
+                reason = 'timeout' if _is_timeout(e) else 'error'
+                skipped.append({'stage': name, 'reason': reason, 'error': f'{type(e).__name__}: {e}'})
+                print(f"  → ⚠️  Skipped — {reason}: {type(e).__name__}: {e}")
+                continue
+        timings[name] = int((time.monotonic() - stage_start) * 1000)
+
+        if name == 'scrape' and ctx['raw'].get('blocked'):
+            return {
+                'id': analysis_id, 'url': url, 'error': 'Site blocked scraping (bot protection)',
+                'status': 'blocked'
+            }
+        if name == 'scrape' and ctx['raw'].get('rejected'):
+            return {
+                'id': analysis_id, 'url': url,
+                'error': f"Not an HTML page (Content-Type: {ctx['raw'].get('contentType') or 'unknown'})",
+                'status': 'unsupported'
+            }
+        if name == 'scrape' and dedupe and ctx['raw'].get('fingerprint'):
+            fingerprinted = True
+            dup, reuse = _find_near_duplicate(url, ctx['raw'])
+        if spec.get('summary'):
+            print(f"  → {spec['summary'](ctx[spec['output']])}")
+
+    result = assemble(analysis_id, url, ctx)
+    result['stageTimingsMs'] = timings
+    if skipped:
+        result['status'] = 'partial'
+        result['skippedStages'] = skipped
+    if deadline:
+        result['deadlineMs'] = int(deadline * 1000)
+        result['elapsedMs'] = int((time.monotonic() - started) * 1000)
+    # Shared-index writes wait on other processes, so they get whatever time is left
+    remaining = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+    if fingerprinted:
+        result['nearDuplicate'] = _record_page(url, ctx, plan, dup, remaining)
+
+    # Save result
+    out_path = os.path.join(TMP_DIR, f"{analysis_id}_result{storage.extension()}")
+    storage.write(out_path, result)
+    _index_result(result, None if deadline_at is None else max(0.0, deadline_at - time.monotonic()))
+    if skipped:
+        print(f"\n⚠️  Partial analysis — skipped: {', '.join(s['stage'] for s in skipped)}")
+    print(f"\n✅ Analysis complete. Saved to {out_path}")
+    print(f"{'='*50}\n")
+
+    return result
+
+def assemble(analysis_id: str, url: str, ctx: dict) -> dict:
+    """Build the output payload from whichever stages ran."""
+    raw = ctx.get('raw', {})
+    tech = ctx.get('tech')
+    ai = ctx.get('ai')
 
-    # ── STEP 2: TECH DETECTION ────────────────────────────
-    print("Step 2/5: 🛠️  Detecting tech stack...")
-    tech = detect_tech.detect(raw)
-    print(f"  → Framework: {tech['framework']} | CMS: {tech['cms']} | Confidence: {tech['confidence']}%")
-
-    # ── STEP 3: SEO AUDIT ─────────────────────────────────
-    print("Step 3/5: 📊 Running SEO audit...")
-    seo = seo_audit.audit(raw)
-    print(f"  → Score: {seo['score']}/100 (Grade: {seo['grade']}) | Issues: {len(seo['issues'])}")
-
-    # ── STEP 4: COMPETITIVE INTEL ─────────────────────────
-    print("Step 4/5: 📢 Checking for ads & tracking...")
-    competitive = detect_competitive.detect(raw)
-    print(f"  → Ads running: {competitive['adsRunning']} | Networks: {len(competitive['adNetworks'])}")
-
-    # ── STEP 5: AI ANALYSIS ───────────────────────────────
-    print("Step 5/5: 🤖 Running AI analysis...")
-    ai = ai_analyze.analyze(seo, tech, competitive, url)
-    if ai.get('error'):
-        print(f"  ⚠️  AI: {ai['error']}")
-    else:
-        print(f"  → {len(ai.get('aiRecommendations', []))} recommendations generated")
-
-    # ── ASSEMBLE PAYLOAD ──────────────────────────────────
     result = {
         'id': analysis_id,
         'url': url,
         'analyzedAt': raw.get('timestamp'),
         'status': 'done',
-        'seo': seo,
-        'techStack': tech,
-        'competitive': competitive,
-        'architecture': {
-            'type': _infer_arch_type(tech, raw),
-            'diagram': ai.get('architectureDiagram', '')
-        },
-        'aiSummary': ai.get('aiSummary'),
-        'aiRecommendations': ai.get('aiRecommendations', []),
-        'competitiveSummary': ai.get('competitiveSummary')
+        'loadTimeMs': raw.get('loadTimeMs'),
     }
+    if 'seo' in ctx:
+        result['seo'] = ctx['seo']
+    if tech is not None:
+        result['techStack'] = tech
+    if 'competitive' in ctx:
+        result['competitive'] = ctx['competitive']
+    if tech is not None:
+        result['architecture'] = {
+            'type': _infer_arch_type(tech, raw),
+            'diagram': ai.get('architectureDiagram', '') if ai else ''
+        }
+    if ai is not None:
+        result['aiSummary'] = ai.get('aiSummary')
+        result['aiRecommendations'] = ai.get('aiRecommendations', [])
+        result['competitiveSummary'] = ai.get('competitiveSummary')
+    for spec in analyzers.ANALYZERS.values():
+        if spec['output'] not in ctx:
+            continue
+        if spec.get('section'):
+            result[spec['section']] = ctx[spec['output']]
+        elif spec.get('merge'):
+            _merge(result, spec['merge'], ctx[spec['output']])
+    return result
 
-    # Save result
-    out_path = os.path.join(TMP_DIR, f"{analysis_id}_result.json")
-    with open(out_path, 'w') as f:
-        json.dump(result, f, indent=2)
-    print(f"\n✅ Analysis complete. Saved to {out_path}")
-    print(f"{'='*50}\n")
+def _merge(result: dict, merge: tuple, value: dict) -> None:
+    """
+    Fold a stage's output into an existing section, e.g. link health into 'seo'. Lists the
+    section already has are extended with new items, other keys it already has are replaced,
+    and everything else is nested under the stage's field.
+    """
+    key, field = merge
+    # Copy: the section may be shared with a near-duplicate's stored analysis
+    section = dict(result.get(key) or {})
+    nested = {}
+    for k, v in value.items():
+        if isinstance(section.get(k), list) and isinstance(v, list):
+            section[k] = section[k] + [item for item in v if item not in section[k]]
+        elif k in section:
+            section[k] = v
+        else:
+            nested[k] = v
+    section[field] = nested
+    result[key] = section
 
-    return result
+def _find_near_duplicate(url: str, raw: dict) -> tuple[dict | None, dict]:
+    """The representative this page duplicates and its stored stage outputs ((None, {}) if none is fresh)."""
+    import near_dup
+    with near_dup.SiteIndex(url) as site_index:
+        dup = site_index.find(url, raw['fingerprint'])
+        reuse = site_index.analysis(dup['representative']) if dup else None
+    if not reuse:
+        return None, {}
+    print(f"  → Near-duplicate of {dup['representative']} ({dup['similarity']:.0%} similar) — reusing its analysis")
+    return dup, reuse
+
+def _record_page(url: str, ctx: dict, plan: list[str], dup: dict | None,
+                 timeout: float | None = None) -> dict | None:
+    """
+    Add this page to its site's LSH index and return the report's nearDuplicate grouping.
+    With a `timeout` (the run's remaining budget) a busy index is skipped, not waited on.
+    """
+    reusable = {analyzers.ANALYZERS[n]['output']: ctx[analyzers.ANALYZERS[n]['output']]
+                for n in plan if analyzers.ANALYZERS[n].get('reusable') and analyzers.ANALYZERS[n]['output'] in ctx}
+    import near_dup
+    fp = ctx['raw']['fingerprint']
+    if timeout is not None and timeout <= 0:
+        print("WARN: Out of time — page not added to the near-duplicate index")
+        return dup
+    with storage.locked(near_dup.index_path(url), timeout=timeout) as acquired:
+        if not acquired:
+            print("WARN: Near-duplicate index busy — page not added")
+            return dup
+        with near_dup.SiteIndex(url, timeout=timeout) as site_index:
+            # Read under the lock so concurrent runs on one site don't drop each other's pages
+            stored = site_index.analysis(dup['representative']) if dup else None
+            if stored is not None:
+                rep = dup['representative']
+                missing = {key: value for key, value in reusable.items() if key not in stored}
+                if missing:
+                    site_index.analyses.set(rep, dict(stored, **missing))
+                site_index.add(url, fp, representative=rep)
+            else:
+                dup = None
+                site_index.add(url, fp, analysis=reusable)
+            site_index.save()
+            group_size = len(site_index.groups().get(dup['representative'], [])) + 1 if dup else 0
+    if not dup:
+        return None
+    return dict(dup, groupSize=group_size)
+
+def _index_result(result: dict, timeout: float | None = None) -> None:
+    """Keep the technology → sites index current (disable with SITE_INTEL_TECH_INDEX=0)."""
+    if os.environ.get('SITE_INTEL_TECH_INDEX', '1') == '0':
+        return
+    if 'techStack' not in result and 'competitive' not in result:
+        return
+    if timeout is not None and timeout <= 0:
+        print("WARN: Out of time — tech index not updated")
+        return
+    try:
+        import tech_index
+        tech_index.update_from_result(result, timeout)
+    except Exception as e:
+        print(f"WARN: Could not update tech index: {e}")
 
 def _infer_arch_type(tech: dict, raw: dict) -> str:
     fw = tech.get('framework', '')
-    html = raw.get('html', '')
     if fw in ('Next.js', 'Nuxt.js'):
         return 'SSR/SSG Hybrid'
     if fw == 'Gatsby':
@@ -102,11 +300,34 @@ def _infer_arch_type(tech: dict, raw: dict) -> str:
     return 'Unknown'
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python run_pipeline.py <url>")
+    parser = argparse.ArgumentParser(description='Run the Site Intel analysis pipeline on a URL')
+    parser.add_argument('url')
+    parser.add_argument('--only', help=f"Comma-separated analyzers to run ({', '.join(analyzers.ANALYZERS)}); "
+                                       "required upstream stages are added automatically")
+    parser.add_argument('--with', dest='extra', help="Comma-separated optional analyzers to add, e.g. 'weight'")
+    parser.add_argument('--throttle', help='Network/CPU throttling profile for the Playwright scrape '
+                                           '(see perf_metrics.THROTTLE_PROFILES, e.g. mobile, slow-3g)')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the 1-hour scrape cache')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help="Analyze the page in full even if it is a near-duplicate of one already analyzed")
+    parser.add_argument('--deadline', type=float,
+                        help='Total time budget in seconds; stages that run out of time are skipped '
+                             "and the report is returned with status 'partial'")
+    args = parser.parse_args()
+
+    try:
+        only = analyzers.parse_selection(args.only)
+        extra = analyzers.parse_selection(args.extra)
+    except ValueError as e:
+        print(f"ERROR: {e}")
         sys.exit(1)
 
-    result = run_pipeline(sys.argv[1])
+    def show_recommendation(kind, value):
+        if kind == 'aiRecommendation':
+            print(f"  ↳ [{value.get('priority')}] {value.get('issue')}")
+
+    result = run_pipeline(args.url, only=only, extra=extra, throttle=args.throttle, refresh=args.refresh,
+                          dedupe=not args.no_dedupe, deadline=args.deadline, on_event=show_recommendation)
     # Print summary without full HTML
     summary = {k: v for k, v in result.items() if k not in ('rawHtml',)}
     print(json.dumps(summary, indent=2))
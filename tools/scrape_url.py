@@ -11,28 +11,49 @@ import json
 import time
 import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from urllib.parse import urlparse, urljoin
 
 try:
-    import requests
     from bs4 import BeautifulSoup
 except ImportError:
     print("ERROR: Missing dependencies. Run: pip install requests beautifulsoup4 playwright")
     sys.exit(1)
 
+sys.path.insert(0, os.path.dirname(__file__))
+
+import storage
+import http_fetch
+import perf_metrics
+import near_dup
+
 TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
 os.makedirs(TMP_DIR, exist_ok=True)
 
 CACHE_TTL_SECONDS = 3600  # 1 hour
+MAX_AUX_BYTES = 1024 * 1024  # robots.txt / sitemap.xml cap
+
+# Default timeouts; a pipeline deadline can only shorten these (see _budget)
+NAV_TIMEOUT_MS = 15000           # Playwright goto, waiting for networkidle
+FALLBACK_NAV_TIMEOUT_MS = 10000  # Playwright retry, waiting for domcontentloaded only
+REQUEST_TIMEOUT = 15             # requests fallback, seconds
+AUX_TIMEOUT = 10                 # robots.txt / sitemap.xml, seconds
+LOCK_WAIT_SECONDS = 120          # longest wait for a concurrent scrape of the same page
+PREFLIGHT_TIMEOUT = 5            # headers-only check before Playwright, seconds
 
 def sanitize_domain(url: str) -> str:
     parsed = urlparse(url)
     return parsed.netloc.replace('.', '_').replace(':', '_')
 
-def get_cache_path(url: str) -> str:
+def get_cache_path(url: str, throttle: str | None = None) -> str:
     domain = sanitize_domain(url)
-    return os.path.join(TMP_DIR, f"{domain}_raw.json")
+    # Home pages keep the historical {domain}_raw name; deeper pages get a short path hash
+    parsed = urlparse(url)
+    page = parsed.path.rstrip('/') + (f'?{parsed.query}' if parsed.query else '')
+    suffix = f"_{hashlib.sha1(page.encode()).hexdigest()[:10]}" if page else ''
+    suffix += f"_{throttle.replace('-', '_')}" if throttle else ''
+    return os.path.join(TMP_DIR, f"{domain}{suffix}_raw{storage.extension()}")
 
 def is_cache_valid(cache_path: str) -> bool:
     if not os.path.exists(cache_path):
@@ -41,28 +62,43 @@ def is_cache_valid(cache_path: str) -> bool:
     age = time.time() - mtime
     return age < CACHE_TTL_SECONDS
 
-def fetch_text(url: str, timeout: int = 10) -> str | None:
+def _budget(default: float, deadline: float | None, share: float = 1.0) -> float:
+    """A timeout in seconds: the default, or less if the deadline (time.monotonic()) is closer."""
+    if deadline is None:
+        return default
+    return max(0.1, min(default, (deadline - time.monotonic()) * share))
+
+def _fetch_aux(url: str, timeout: float = AUX_TIMEOUT) -> tuple[str | None, bool]:
+    """Fetch a small text resource; returns (text, truncated)."""
     try:
-        r = requests.get(url, timeout=timeout, headers={'User-Agent': 'SiteIntelBot/1.0'})
-        if r.status_code == 200:
-            return r.text
+        r = http_fetch.stream_get(url, timeout=timeout, max_bytes=MAX_AUX_BYTES, accept=http_fetch.TEXT_TYPES,
+                                  max_seconds=timeout)
+        if r['statusCode'] == 200 and not r['rejected']:
+            return r['text'], r['truncated']
     except Exception:
         pass
-    return None
+    return None, False
 
-def scrape_with_requests(url: str) -> dict:
-    """Fallback scraper using requests + BeautifulSoup for static sites."""
-    start = time.time()
-    headers = {'User-Agent': 'SiteIntelBot/1.0', 'Accept-Language': 'en-US,en;q=0.9'}
-    
-    r = requests.get(url, timeout=15, headers=headers, allow_redirects=True)
-    load_time = int((time.time() - start) * 1000)
-    
-    final_url = r.url
-    status_code = r.status_code
-    response_headers = dict(r.headers)
-    html = r.text
+def fetch_text(url: str, timeout: float = AUX_TIMEOUT) -> str | None:
+    return _fetch_aux(url, timeout)[0]
 
+def rejected_payload(url: str, final_url: str, status_code: int, headers: dict, ctype: str, method: str) -> dict:
+    """Payload for a URL that turned out not to be an HTML page."""
+    return {
+        'url': url,
+        'finalUrl': final_url,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'statusCode': status_code,
+        'loadTimeMs': 0,
+        'html': '',
+        'headers': headers,
+        'contentType': ctype,
+        'rejected': True,
+        'scrapeMethod': method
+    }
+
+def parse_html(html: str, final_url: str) -> dict:
+    """Extract the structured page fields shared by every scrape method."""
     soup = BeautifulSoup(html, 'html.parser')
     base_domain = urlparse(final_url).netloc
 
@@ -75,39 +111,55 @@ def scrape_with_requests(url: str) -> dict:
             meta_tags.append({'name': name, 'content': content})
 
     # OpenGraph
-    og = {}
-    for m in meta_tags:
-        if m['name'].startswith('og:'):
-            og[m['name']] = m['content']
+    og = {m['name']: m['content'] for m in meta_tags if m['name'].startswith('og:')}
 
-    # Scripts
+    # Scripts & stylesheets
     scripts = [s.get('src', '') for s in soup.find_all('script') if s.get('src')]
-    
-    # Stylesheets
     stylesheets = [l.get('href', '') for l in soup.find_all('link', rel='stylesheet') if l.get('href')]
-    
+
     # Images
-    images = []
-    for img in soup.find_all('img'):
-        images.append({
-            'src': img.get('src', ''),
-            'alt': img.get('alt'),
-            'width': img.get('width'),
-            'height': img.get('height')
-        })
+    images = [{'src': i.get('src', ''), 'alt': i.get('alt'), 'width': i.get('width'), 'height': i.get('height')}
+              for i in soup.find_all('img')]
 
     # Links
     internal_links, external_links = [], []
     for a in soup.find_all('a', href=True):
         href = a['href']
         if href.startswith('http'):
-            if base_domain in href:
-                internal_links.append(href)
-            else:
-                external_links.append(href)
+            (internal_links if base_domain in href else external_links).append(href)
         elif href.startswith('/'):
             internal_links.append(urljoin(final_url, href))
 
+    return {
+        'scripts': scripts,
+        'stylesheets': stylesheets,
+        'metaTags': meta_tags,
+        'openGraph': og,
+        'links': {'internal': list(set(internal_links))[:50], 'external': list(set(external_links))[:50]},
+        'images': images,
+        # Last: fingerprinting strips script/style tags from the soup
+        'fingerprint': near_dup.fingerprint(soup),
+    }
+
+def scrape_with_requests(url: str, deadline: float | None = None) -> dict:
+    """Fallback scraper using requests + BeautifulSoup for static sites."""
+    start = time.time()
+    headers = {'Accept-Language': 'en-US,en;q=0.9'}
+
+    timeout = _budget(REQUEST_TIMEOUT, deadline)
+    r = http_fetch.stream_get(url, timeout=timeout, headers=headers, accept=http_fetch.HTML_TYPES,
+                              max_seconds=timeout if deadline is not None else None)
+    load_time = int((time.time() - start) * 1000)
+
+    final_url = r['finalUrl']
+    status_code = r['statusCode']
+    response_headers = r['headers']
+    if r['rejected']:
+        return rejected_payload(url, final_url, status_code, response_headers, r['contentType'], 'requests')
+    html = r['text']
+
+    page = parse_html(html, final_url)
+
     return {
         'url': url,
         'finalUrl': final_url,
@@ -116,73 +168,96 @@ def scrape_with_requests(url: str) -> dict:
         'loadTimeMs': load_time,
         'html': html,
         'headers': response_headers,
-        'scripts': scripts,
-        'stylesheets': stylesheets,
-        'metaTags': meta_tags,
-        'openGraph': og,
-        'links': {'internal': list(set(internal_links))[:50], 'external': list(set(external_links))[:50]},
-        'images': images,
+        **page,
         'cookies': [],  # requests doesn't expose cookies easily
         'robots': None,
         'sitemap': None,
+        'contentType': r['contentType'],
+        'bytesRead': r['bytesRead'],
+        'truncated': ['html'] if r['truncated'] else [],
         'scrapeMethod': 'requests'
     }
 
-def scrape_with_playwright(url: str) -> dict:
-    """Full scraper using Playwright for JS-heavy SPAs."""
+def _preflight(url: str, deadline: float | None = None) -> dict | None:
+    """
+    Headers-only look at the document (the body is dropped after the first chunk). The
+    browser downloads a document in full before we can see it, so the content-type and
+    size guards have to run first. None if the check itself failed.
+    """
+    try:
+        return http_fetch.stream_get(url, timeout=_budget(PREFLIGHT_TIMEOUT, deadline, 0.2),
+                                     accept=http_fetch.HTML_TYPES, max_bytes=1)
+    except Exception:
+        return None
+
+def scrape_with_playwright(url: str, throttle: str | None = None, deadline: float | None = None) -> dict:
+    """Full scraper using Playwright for JS-heavy SPAs. Also records in-page rendering metrics."""
     try:
         from playwright.sync_api import sync_playwright
     except ImportError:
         print("WARN: Playwright not installed. Falling back to requests. Run: pip install playwright && playwright install chromium")
         return None
 
+    head = _preflight(url, deadline)
+    if head is not None:
+        if head['rejected']:
+            return rejected_payload(url, head['finalUrl'], head['statusCode'], head['headers'],
+                                    head['contentType'], 'playwright')
+        length = next((v for k, v in head['headers'].items() if k.lower() == 'content-length'), '')
+        if length.isdigit() and int(length) > http_fetch.MAX_BODY_BYTES:
+            print(f"WARN: {url} declares {int(length) // 1024} KB, over the download cap — using the streaming requests scraper")
+            return scrape_with_requests(url, deadline)
+
     start = time.time()
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         context = browser.new_context(user_agent='SiteIntelBot/1.0')
+        context.add_init_script(script=perf_metrics.INIT_SCRIPT)
         page = context.new_page()
-        
+        perf_metrics.apply_throttle(context, page, throttle)
+
+        # loadTimeMs keeps its original meaning (browser startup included); navigationMs is the goto alone
+        nav_start = time.time()
         response = None
         try:
-            response = page.goto(url, wait_until='networkidle', timeout=15000)
+            # Leave part of a tight budget for the domcontentloaded retry
+            response = page.goto(url, wait_until='networkidle',
+                                 timeout=_budget(NAV_TIMEOUT_MS / 1000, deadline, 0.6) * 1000)
         except Exception:
             try:
-                response = page.goto(url, wait_until='domcontentloaded', timeout=10000)
+                response = page.goto(url, wait_until='domcontentloaded',
+                                     timeout=_budget(FALLBACK_NAV_TIMEOUT_MS / 1000, deadline) * 1000)
             except Exception as e:
                 browser.close()
                 raise RuntimeError(f"Failed to load page: {e}")
 
         load_time = int((time.time() - start) * 1000)
+        navigation_time = int((time.time() - nav_start) * 1000)
         final_url = page.url
         status_code = response.status if response else 0
         raw_headers = response.headers if response else {}
+        ctype = http_fetch.content_type(raw_headers)
+        if not http_fetch.is_accepted(ctype, http_fetch.HTML_TYPES):
+            browser.close()
+            return rejected_payload(url, final_url, status_code, dict(raw_headers), ctype, 'playwright')
         html = page.content()
         cookies = [c['name'] for c in context.cookies()]
+        try:
+            performance = perf_metrics.collect(page)
+            performance['throttle'] = throttle
+        except Exception as e:
+            print(f"WARN: Could not collect performance metrics: {e}")
+            performance = None
         browser.close()
 
-    # Parse HTML
-    soup = BeautifulSoup(html, 'html.parser')
-    base_domain = urlparse(final_url).netloc
+    # Documents without a Content-Length get past the preflight; cap what we keep and parse
+    html_bytes = html.encode('utf-8')
+    truncated = len(html_bytes) > http_fetch.MAX_BODY_BYTES
+    if truncated:
+        html = html_bytes[:http_fetch.MAX_BODY_BYTES].decode('utf-8', errors='ignore')
 
-    meta_tags = []
-    for tag in soup.find_all('meta'):
-        name = tag.get('name') or tag.get('property') or ''
-        content = tag.get('content') or ''
-        if name:
-            meta_tags.append({'name': name, 'content': content})
-
-    og = {m['name']: m['content'] for m in meta_tags if m['name'].startswith('og:')}
-    scripts = [s.get('src', '') for s in soup.find_all('script') if s.get('src')]
-    stylesheets = [l.get('href', '') for l in soup.find_all('link', rel='stylesheet') if l.get('href')]
-    images = [{'src': i.get('src',''), 'alt': i.get('alt'), 'width': i.get('width'), 'height': i.get('height')} for i in soup.find_all('img')]
-    
-    internal_links, external_links = [], []
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        if href.startswith('http'):
-            (internal_links if base_domain in href else external_links).append(href)
-        elif href.startswith('/'):
-            internal_links.append(urljoin(final_url, href))
+    # Parse HTML
+    page = parse_html(html, final_url)
 
     return {
         'url': url,
@@ -190,43 +265,76 @@ def scrape_with_playwright(url: str) -> dict:
         'timestamp': datetime.now(timezone.utc).isoformat(),
         'statusCode': status_code,
         'loadTimeMs': load_time,
+        'navigationMs': navigation_time,
         'html': html,
         'headers': dict(raw_headers),
-        'scripts': scripts,
-        'stylesheets': stylesheets,
-        'metaTags': meta_tags,
-        'openGraph': og,
-        'links': {'internal': list(set(internal_links))[:50], 'external': list(set(external_links))[:50]},
-        'images': images,
+        **page,
         'cookies': cookies,
         'robots': None,
         'sitemap': None,
+        'contentType': ctype,
+        'bytesRead': min(len(html_bytes), http_fetch.MAX_BODY_BYTES),
+        'truncated': ['html'] if truncated else [],
+        'performance': performance,
         'scrapeMethod': 'playwright'
     }
 
-def run(url: str) -> dict:
+def run(url: str, throttle: str | None = None, refresh: bool = False, timeout: float | None = None) -> dict:
+    """Scrape a URL (or return the cached scrape). `timeout` caps the whole fetch in seconds."""
     if not url.startswith(('http://', 'https://')):
         print(f"ERROR: Invalid URL '{url}'. Must start with http:// or https://")
         sys.exit(1)
 
-    cache_path = get_cache_path(url)
-    if is_cache_valid(cache_path):
+    if throttle and throttle not in perf_metrics.THROTTLE_PROFILES:
+        print(f"ERROR: Unknown throttle profile '{throttle}'. Choose one of: {', '.join(perf_metrics.THROTTLE_PROFILES)}")
+        sys.exit(1)
+
+    cache_path = get_cache_path(url, throttle)
+    if not refresh and is_cache_valid(cache_path):
         print(f"INFO: Using cached data for {url} (fresher than 1 hour)")
-        with open(cache_path) as f:
-            return json.load(f)
+        return storage.load_raw(cache_path)
+
+    # Single flight: one scrape per cache key at a time, across threads and processes.
+    # Whoever waited re-checks the cache, and takes a scrape that finished after it asked.
+    requested_at = time.time()
+    deadline = time.monotonic() + timeout if timeout else None
+    with storage.locked(cache_path, timeout=timeout or LOCK_WAIT_SECONDS) as acquired:
+        if not acquired:
+            print(f"WARN: Gave up waiting for another scrape of {url} (timed out or abandoned) — scraping anyway")
+        elif os.path.exists(cache_path) and (os.path.getmtime(cache_path) >= requested_at or
+                                             (not refresh and is_cache_valid(cache_path))):
+            print(f"INFO: Using data from a concurrent scrape of {url}")
+            return storage.load_raw(cache_path)
+        return _scrape(url, throttle, deadline, cache_path)
 
+def abandon(url: str, throttle: str | None = None) -> None:
+    """The pipeline stopped waiting for this scrape: scrapes queued behind it go ahead."""
+    storage.abandon(get_cache_path(url, throttle))
+
+def _scrape(url: str, throttle: str | None, deadline: float | None, cache_path: str) -> dict:
     print(f"INFO: Scraping {url}...")
-    
-    # Fetch robots.txt and sitemap
+
+    # Fetch robots.txt and sitemap alongside the page itself
     parsed = urlparse(url)
     base = f"{parsed.scheme}://{parsed.netloc}"
-    robots_content = fetch_text(f"{base}/robots.txt")
-    sitemap_content = fetch_text(f"{base}/sitemap.xml")
+    aux_timeout = _budget(AUX_TIMEOUT, deadline)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        robots_future = pool.submit(_fetch_aux, f"{base}/robots.txt", aux_timeout)
+        sitemap_future = pool.submit(_fetch_aux, f"{base}/sitemap.xml", aux_timeout)
+
+        # Try Playwright first, fallback to requests
+        data = scrape_with_playwright(url, throttle, deadline)
+        if data is None:
+            if throttle:
+                print("WARN: Throttling requires Playwright — the requests fallback is unthrottled")
+            data = scrape_with_requests(url, deadline)
 
-    # Try Playwright first, fallback to requests
-    data = scrape_with_playwright(url)
-    if data is None:
-        data = scrape_with_requests(url)
+        robots_content, robots_truncated = robots_future.result()
+        sitemap_content, sitemap_truncated = sitemap_future.result()
+
+    if data.get('rejected'):
+        print(f"WARN: {url} is not an HTML page (Content-Type: {data['contentType'] or 'unknown'}) — skipped body")
+        return data
 
     # Check for bot protection
     if data['statusCode'] in [403, 503]:
@@ -235,20 +343,25 @@ def run(url: str) -> dict:
 
     data['robots'] = robots_content
     data['sitemap'] = sitemap_content
+    if robots_truncated:
+        data['truncated'].append('robots')
+    if sitemap_truncated:
+        data['truncated'].append('sitemap')
+    if data['truncated']:
+        print(f"WARN: Truncated {', '.join(data['truncated'])} at the download size cap")
 
-    # Write to cache
-    with open(cache_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    # Write to cache (HTML goes to a separate compressed blob)
+    storage.save_raw(cache_path, data)
     print(f"INFO: Saved to {cache_path}")
 
     return data
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python scrape_url.py <url>")
+        print("Usage: python scrape_url.py <url> [throttle_profile]")
         sys.exit(1)
-    
-    result = run(sys.argv[1])
+
+    result = run(sys.argv[1], throttle=sys.argv[2] if len(sys.argv) > 2 else None)
     # Print summary, not full HTML
     summary = {k: v for k, v in result.items() if k != 'html'}
     summary['htmlLength'] = len(result.get('html', ''))
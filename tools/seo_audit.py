@@ -218,8 +218,8 @@ if __name__ == '__main__':
         print("Usage: python seo_audit.py <path_to_raw.json>")
         sys.exit(1)
 
-    with open(sys.argv[1]) as f:
-        raw = json.load(f)
+    import storage
+    raw = storage.load_raw(sys.argv[1])
 
     result = audit(raw)
     print(json.dumps(result, indent=2))
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Tool: storage.py
+Purpose: Pluggable on-disk serialization for raw scrapes and results (JSON / msgpack + compressed text blobs)
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import gzip
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-flight only within one process
+    fcntl = None
+
+# 'json' (orjson when installed, stdlib otherwise) or 'msgpack' (compact binary)
+BACKEND = os.environ.get('SITE_INTEL_SERIALIZER', 'json').lower()
+HTML_BLOB_EXT = '.html.gz'
+HTML_COMPRESS_LEVEL = 6
+LOCK_DIR_NAME = 'locks'
+LOCK_POLL_SECONDS = 0.05
+
+_EXTENSIONS = {'json': '.json', 'msgpack': '.msgpack'}
+_warned_fallback = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _backend(name: str | None = None) -> str:
+    global _warned_fallback
+    name = (name or BACKEND).lower()
+    if name not in _EXTENSIONS:
+        raise ValueError(f"Unknown serializer '{name}'. Choose one of: {', '.join(_EXTENSIONS)}")
+    if name == 'msgpack':
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            if not _warned_fallback:
+                print("WARN: msgpack not installed. Falling back to JSON. Run: pip install msgpack")
+                _warned_fallback = True
+            return 'json'
+    return name
+
+def extension(backend: str | None = None) -> str:
+    return _EXTENSIONS[_backend(backend)]
+
+def backend_for(path: str) -> str:
+    return 'msgpack' if path.endswith('.msgpack') else 'json'
+
+def dumps(obj, backend: str | None = None) -> bytes:
+    backend = _backend(backend)
+    if isinstance(obj, LazyPayload):
+        obj = obj.copy()  # the C serializers read the dict storage directly, skipping the lazy fields
+    if backend == 'msgpack':
+        import msgpack
+        return msgpack.packb(obj, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def loads(data: bytes, backend: str | None = None):
+    backend = _backend(backend)
+    if backend == 'msgpack':
+        import msgpack
+        return msgpack.unpackb(data, raw=False)
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """
+    Write via a temp file in the same directory and rename it over path, so readers see
+    either the old file or the new one — never a half-written one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def write(path: str, obj) -> None:
+    """Serialize obj to path (atomically), picking the backend from the file extension."""
+    atomic_write_bytes(path, dumps(obj, backend_for(path)))
+
+def read(path: str):
+    with open(path, 'rb') as f:
+        return loads(f.read(), backend_for(path))
+
+# ── RAW SCRAPE PAYLOADS ──────────────────────────────────
+
+# Large text fields kept out of the payload file, each in its own gzip blob next to it,
+# so loading a payload reads only the small metadata
+BLOB_FIELDS = {'html': HTML_BLOB_EXT, 'robots': '.robots.gz', 'sitemap': '.sitemap.gz'}
+
+def blob_path(path: str, field: str = 'html') -> str:
+    return os.path.splitext(path)[0] + BLOB_FIELDS[field]
+
+def html_blob_path(path: str) -> str:
+    return blob_path(path, 'html')
+
+def blob_paths(path: str) -> list[str]:
+    return [blob_path(path, field) for field in BLOB_FIELDS]
+
+class LazyPayload(dict):
+    """
+    A raw scrape payload whose 'html', 'robots' and 'sitemap' are read from their compressed
+    blobs on first access. Everything else (headers, scripts, metaTags...) is available
+    without touching a blob. Anything that walks the whole payload (iteration, items(),
+    copy(), dict(raw), dumps) loads the blobs first, so copies and re-serializations never
+    lose the page body.
+    """
+
+    def __init__(self, data: dict, path: str):
+        super().__init__(data)
+        self._path = path
+
+    def _load(self, key) -> None:
+        if key not in BLOB_FIELDS or dict.__contains__(self, key):
+            return
+        blob = blob_path(self._path, key)
+        if os.path.exists(blob):
+            with gzip.open(blob, 'rt', encoding='utf-8') as f:
+                dict.__setitem__(self, key, f.read())
+        elif key == 'html':
+            dict.__setitem__(self, 'html', '')
+
+    def _load_all(self) -> None:
+        for key in BLOB_FIELDS:
+            self._load(key)
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        if key in BLOB_FIELDS:
+            return dict.__contains__(self, key) or os.path.exists(blob_path(self._path, key))
+        return super().__contains__(key)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def __eq__(self, other):
+        self._load_all()
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def copy(self) -> dict:
+        self._load_all()
+        return dict(super().items())
+
+    def pop(self, key, *default):
+        self._load(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+def save_raw(path: str, data: dict) -> None:
+    """
+    Write a raw payload: the HTML and any robots.txt/sitemap text go to gzip blobs next to
+    path, the rest to path itself. A missing robots/sitemap (None) stays inline.
+    """
+    meta = {k: v for k, v in data.items() if k not in BLOB_FIELDS}
+    unused = []
+    # Blobs first: a payload file on disk always has its blobs
+    for field in BLOB_FIELDS:
+        value = (data.get(field) or '') if field == 'html' else data.get(field)
+        if isinstance(value, str):
+            atomic_write_bytes(blob_path(path, field), gzip.compress(value.encode('utf-8'), HTML_COMPRESS_LEVEL))
+        else:
+            if field in data:
+                meta[field] = value
+            unused.append(blob_path(path, field))
+    write(path, meta)
+    # Left by an earlier save of the same page; the new payload file no longer points at them
+    for blob in unused:
+        try:
+            os.remove(blob)
+        except FileNotFoundError:
+            pass
+
+def load_raw(path: str) -> dict:
+    """Load a raw payload saved by save_raw (or a legacy file with inline HTML, robots and sitemap)."""
+    return LazyPayload(read(path), path)
+
+# ── SINGLE-FLIGHT LOCKS ──────────────────────────────────
+
+_thread_locks = {}  # path → [lock, threads holding or waiting]; dropped when that reaches 0
+_thread_locks_guard = threading.Lock()
+
+def lock_path(path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(path)), LOCK_DIR_NAME, os.path.basename(path) + '.lock')
+
+def abandon_path(path: str) -> str:
+    return lock_path(path) + '.abandoned'
+
+def abandon(path: str) -> None:
+    """
+    Record that whoever holds `path`'s lock has been given up on (a stage thread the
+    pipeline stopped waiting for keeps running, and keeps the lock). Waiters then get
+    False from locked() instead of queueing behind it; the next holder clears the mark.
+    """
+    marker = abandon_path(path)
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    with open(marker, 'a'):
+        pass
+
+def _stop_waiting(deadline: float | None, marker: str) -> bool:
+    return (deadline is not None and time.monotonic() >= deadline) or os.path.exists(marker)
+
+def _clear(marker: str) -> None:
+    try:
+        os.remove(marker)
+    except FileNotFoundError:
+        pass
+
+def _is_current(f, lp: str) -> bool:
+    # A holder unlinks the lock file on release; whoever locked the old inode must retry
+    try:
+        st = os.stat(lp)
+    except FileNotFoundError:
+        return False
+    own = os.fstat(f.fileno())
+    return (st.st_dev, st.st_ino) == (own.st_dev, own.st_ino)
+
+def _try_flock(f) -> bool:
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+@contextmanager
+def locked(path: str, timeout: float | None = None):
+    """
+    Hold an exclusive lock for `path` across threads and processes (flock on a file in
+    a sibling locks/ directory, removed again on release). Yields True once acquired, or
+    False if `timeout` seconds passed first or the holder was abandoned (see abandon),
+    in which case the caller proceeds unlocked rather than stalling.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    marker = abandon_path(path)
+    with _thread_locks_guard:
+        entry = _thread_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    thread_lock = entry[0]
+    try:
+        # Threads queue on an in-process lock; only one per process polls the file lock
+        while not thread_lock.acquire(timeout=LOCK_POLL_SECONDS if deadline is None else
+                                      max(0, min(LOCK_POLL_SECONDS, deadline - time.monotonic()))):
+            if _stop_waiting(deadline, marker):
+                yield False
+                return
+        try:
+            if fcntl is None:
+                _clear(marker)
+                yield True
+                return
+            lp = lock_path(path)
+            os.makedirs(os.path.dirname(lp), exist_ok=True)
+            while True:
+                f = open(lp, 'a')
+                while not _try_flock(f):
+                    if _stop_waiting(deadline, marker):
+                        f.close()
+                        yield False
+                        return
+                    time.sleep(LOCK_POLL_SECONDS)
+                if _is_current(f, lp):
+                    break
+                f.close()
+            try:
+                _clear(marker)
+                yield True
+            finally:
+                # Unlink while still holding the lock, so nobody can lock the old file and think they're alone
+                _clear(lp)
+                _clear(marker)
+                f.close()
+        finally:
+            thread_lock.release()
+    finally:
+        with _thread_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0 and _thread_locks.get(path) is entry:
+                del _thread_locks[path]
+
+def clean_locks(directory: str, stale_seconds: float = 0) -> list[str]:
+    """
+    Remove lock files and abandon marks under directory/locks/ that nobody holds (left
+    by a crashed process; a clean release removes its own), if older than stale_seconds.
+    Returns the removed paths.
+    """
+    removed = []
+    lock_dir = os.path.join(directory, LOCK_DIR_NAME)
+    if fcntl is None or not os.path.isdir(lock_dir):
+        return removed
+    cutoff = time.time() - stale_seconds
+    for name in sorted(os.listdir(lock_dir)):
+        lp = os.path.join(lock_dir, name)
+        if not name.endswith('.lock') or os.path.getmtime(lp) > cutoff:
+            continue
+        with open(lp, 'a') as f:
+            if _try_flock(f) and _is_current(f, lp):
+                _clear(lp)
+                removed.append(lp)
+                if os.path.exists(lp + '.abandoned'):
+                    _clear(lp + '.abandoned')
+                    removed.append(lp + '.abandoned')
+    for name in sorted(os.listdir(lock_dir)):
+        marker = os.path.join(lock_dir, name)
+        # A mark whose lock file is gone outlived the abandoned holder
+        if name.endswith('.abandoned') and not os.path.exists(marker[:-len('.abandoned')]) \
+                and os.path.getmtime(marker) <= cutoff:
+            _clear(marker)
+            removed.append(marker)
+    return removed
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python storage.py <path_to_raw_or_result> | --clean-locks [directory] [min_age_seconds]")
+        sys.exit(1)
+
+    if sys.argv[1] == '--clean-locks':
+        directory = sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), '..', '.tmp')
+        removed = clean_locks(directory, float(sys.argv[3]) if len(sys.argv) > 3 else 0)
+        print(json.dumps({'removed': len(removed), 'paths': removed}, indent=2))
+        sys.exit(0)
+
+    data = load_raw(sys.argv[1]) if '_raw' in os.path.basename(sys.argv[1]) else read(sys.argv[1])
+    print(json.dumps({k: v for k, v in data.items() if k != 'html'}, indent=2))
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Tool: tech_index.py
+Purpose: Incremental inverted index technology/tracker → sites, with boolean "who uses X" queries
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import re
+import json
+import sqlite3
+import argparse
+from bisect import bisect_left
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+os.makedirs(TMP_DIR, exist_ok=True)
+
+INDEX_PATH = os.path.join(TMP_DIR, 'tech_index.sqlite')
+SQLITE_TIMEOUT = 30  # seconds to wait for another writer
+
+TECH_FIELDS = ('framework', 'cms', 'hosting', 'cdn', 'server', 'language')
+EMPTY_VALUES = {'', 'unknown', 'none'}
+# result section → the term prefixes it produces (see terms_for)
+FAMILIES = {'techStack': TECH_FIELDS + ('library',), 'competitive': ('ads', 'pixel')}
+
+# ── POSTING LIST CODEC ───────────────────────────────────
+# Sorted site ids stored as varint-encoded gaps: dense lists of small ids cost ~1 byte per site.
+
+def encode_postings(ids: list[int]) -> bytes:
+    out = bytearray()
+    prev = 0
+    for i in ids:
+        gap = i - prev
+        prev = i
+        while gap >= 0x80:
+            out.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        out.append(gap)
+    return bytes(out)
+
+def decode_postings(data: bytes) -> list[int]:
+    ids, cur, shift, prev = [], 0, 0, 0
+    for b in data:
+        cur |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+            continue
+        prev += cur
+        ids.append(prev)
+        cur, shift = 0, 0
+    return ids
+
+# ── TERMS ────────────────────────────────────────────────
+
+def terms_for(result: dict) -> set[str]:
+    """Field-qualified, lowercased terms such as 'cms:shopify' or 'pixel:meta pixel'."""
+    tech = result.get('techStack') or {}
+    comp = result.get('competitive') or {}
+    terms = set()
+    for field in TECH_FIELDS:
+        value = str(tech.get(field) or '').strip().lower()
+        if value not in EMPTY_VALUES:
+            terms.add(f'{field}:{value}')
+    for lib in tech.get('libraries', []):
+        terms.add(f'library:{lib.lower()}')
+    for net in comp.get('adNetworks', []):
+        terms.add(f'ads:{net.lower()}')
+    for px in comp.get('trackingPixels', []):
+        terms.add(f'pixel:{px.lower()}')
+    return terms
+
+def families_in(result: dict) -> tuple[str, ...]:
+    """Term prefixes the result can speak for: a missing section leaves its terms untouched."""
+    return tuple(prefix for section, prefixes in FAMILIES.items() if section in result for prefix in prefixes)
+
+def domain_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+class TechIndex:
+    def __init__(self, path: str = INDEX_PATH, timeout: float | None = None):
+        self.db = sqlite3.connect(path, timeout=SQLITE_TIMEOUT if timeout is None else timeout)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS sites (id INTEGER PRIMARY KEY, domain TEXT UNIQUE, last_result TEXT);
+            CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE, label TEXT,
+                                              postings BLOB NOT NULL DEFAULT x'', df INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS terms_label ON terms(label);
+            CREATE TABLE IF NOT EXISTS seen (term_id INTEGER, site_id INTEGER, first_seen TEXT, last_seen TEXT,
+                                             active INTEGER, PRIMARY KEY (term_id, site_id));
+            CREATE INDEX IF NOT EXISTS seen_site ON seen(site_id, active);
+            CREATE TABLE IF NOT EXISTS page_terms (site_id INTEGER, page TEXT, term_id INTEGER,
+                                                   PRIMARY KEY (site_id, page, term_id));
+        ''')
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _site_id(self, domain: str) -> int:
+        self.db.execute('INSERT OR IGNORE INTO sites (domain) VALUES (?)', (domain,))
+        return self.db.execute('SELECT id FROM sites WHERE domain = ?', (domain,)).fetchone()[0]
+
+    def _term_id(self, term: str) -> int:
+        label = term.split(':', 1)[1]
+        self.db.execute('INSERT OR IGNORE INTO terms (term, label) VALUES (?, ?)', (term, label))
+        return self.db.execute('SELECT id FROM terms WHERE term = ?', (term,)).fetchone()[0]
+
+    def _page_terms(self, site: int, page: str) -> dict[int, str]:
+        rows = self.db.execute('''
+            SELECT p.term_id, t.term FROM page_terms p JOIN terms t ON t.id = p.term_id
+            WHERE p.site_id = ? AND p.page = ?
+        ''', (site, page)).fetchall()
+        if not rows and not self.db.execute('SELECT 1 FROM page_terms WHERE site_id = ? LIMIT 1', (site,)).fetchone():
+            # Indexed before terms were kept per page: treat its active terms as this page's
+            rows = self.db.execute('''
+                SELECT x.term_id, t.term FROM seen x JOIN terms t ON t.id = x.term_id
+                WHERE x.site_id = ? AND x.active = 1
+            ''', (site,)).fetchall()
+        return dict(rows)
+
+    def update_many(self, results: list[dict]) -> int:
+        """
+        Apply a batch of pipeline results. Each posting list touched by the batch is
+        decoded and re-encoded once, however many sites in the batch changed it.
+
+        Terms are kept per page and a site uses the union over its pages, so indexing
+        /pricing does not retract what the homepage showed. Only the families whose
+        section is in the result are reconciled: a '--only tech' run leaves the
+        site's trackers alone.
+        """
+        adds, removes = {}, {}  # term_id → set(site_id)
+        with self.db:
+            for result in results:
+                if not result.get('url') or ('techStack' not in result and 'competitive' not in result):
+                    continue
+                seen_at = result.get('analyzedAt') or datetime.now(timezone.utc).isoformat()
+                site = self._site_id(domain_of(result['url']))
+                page = result['url']
+                self.db.execute('UPDATE sites SET last_result = ? WHERE id = ?', (result.get('id'), site))
+
+                current = {self._term_id(t) for t in terms_for(result)}
+                prefixes = tuple(f'{p}:' for p in families_in(result))
+                kept = {tid for tid, term in self._page_terms(site, page).items() if not term.startswith(prefixes)}
+                self.db.execute('DELETE FROM page_terms WHERE site_id = ? AND page = ?', (site, page))
+                self.db.executemany('INSERT INTO page_terms (site_id, page, term_id) VALUES (?, ?, ?)',
+                                    [(site, page, tid) for tid in kept | current])
+                used = {r[0] for r in self.db.execute(
+                    'SELECT DISTINCT term_id FROM page_terms WHERE site_id = ?', (site,))}
+
+                active = {r[0] for r in self.db.execute(
+                    'SELECT term_id FROM seen WHERE site_id = ? AND active = 1', (site,))}
+                for tid in current:
+                    self.db.execute('''
+                        INSERT INTO seen (term_id, site_id, first_seen, last_seen, active) VALUES (?, ?, ?, ?, 1)
+                        ON CONFLICT(term_id, site_id) DO UPDATE SET last_seen = excluded.last_seen, active = 1
+                    ''', (tid, site, seen_at, seen_at))
+                    if tid not in active:
+                        adds.setdefault(tid, set()).add(site)
+                        removes.get(tid, set()).discard(site)
+                for tid in active - used:
+                    self.db.execute('UPDATE seen SET active = 0 WHERE term_id = ? AND site_id = ?', (tid, site))
+                    removes.setdefault(tid, set()).add(site)
+                    adds.get(tid, set()).discard(site)
+
+            for tid in set(adds) | set(removes):
+                ids = decode_postings(self.db.execute('SELECT postings FROM terms WHERE id = ?', (tid,)).fetchone()[0])
+                for site in removes.get(tid, ()):
+                    pos = bisect_left(ids, site)
+                    if pos < len(ids) and ids[pos] == site:
+                        ids.pop(pos)
+                new = sorted(adds.get(tid, ()))
+                if new:
+                    ids = sorted(set(ids).union(new)) if ids and new[0] <= ids[-1] else ids + new
+                self.db.execute('UPDATE terms SET postings = ?, df = ? WHERE id = ?',
+                                (encode_postings(ids), len(ids), tid))
+        return len(results)
+
+    def update(self, result: dict) -> None:
+        self.update_many([result])
+
+    # ── QUERIES ───────────────────────────────────────────
+
+    def postings(self, term: str) -> set[int]:
+        """Sites currently using a term. 'cms:shopify' is exact; a bare 'shopify' matches any field."""
+        term = term.strip().lower()
+        if ':' in term and term.split(':', 1)[0] in TECH_FIELDS + ('library', 'ads', 'pixel'):
+            rows = self.db.execute('SELECT postings FROM terms WHERE term = ?', (term,)).fetchall()
+        else:
+            rows = self.db.execute('SELECT postings FROM terms WHERE label = ?', (term,)).fetchall()
+        out = set()
+        for (blob,) in rows:
+            out.update(decode_postings(blob))
+        return out
+
+    def all_sites(self) -> set[int]:
+        return {r[0] for r in self.db.execute('SELECT id FROM sites')}
+
+    def query(self, expression: str) -> list[dict]:
+        """Evaluate e.g. 'Shopify AND Meta Pixel AND NOT GA4' and return matching sites."""
+        ids = _Parser(expression, self).parse()
+        if not ids:
+            return []
+        marks = ','.join('?' * len(ids))
+        rows = self.db.execute(f'SELECT domain, last_result FROM sites WHERE id IN ({marks}) ORDER BY domain',
+                               tuple(ids)).fetchall()
+        return [{'domain': d, 'lastResult': r} for d, r in rows]
+
+    def history(self, term: str) -> list[dict]:
+        """Every site that has ever used a term, with first/last seen times."""
+        term = term.strip().lower()
+        column = 'term' if ':' in term else 'label'
+        rows = self.db.execute(f'''
+            SELECT s.domain, t.term, x.first_seen, x.last_seen, x.active
+            FROM seen x JOIN terms t ON t.id = x.term_id JOIN sites s ON s.id = x.site_id
+            WHERE t.{column} = ? ORDER BY x.first_seen
+        ''', (term,)).fetchall()
+        return [{'domain': d, 'term': t, 'firstSeen': f, 'lastSeen': l, 'active': bool(a)} for d, t, f, l, a in rows]
+
+    def stats(self, limit: int = 25) -> list[dict]:
+        rows = self.db.execute('SELECT term, df, length(postings) FROM terms ORDER BY df DESC LIMIT ?', (limit,))
+        return [{'term': t, 'sites': df, 'postingBytes': size} for t, df, size in rows]
+
+_TOKEN = re.compile(r'\s*(\(|\)|\bAND\b|\bOR\b|\bNOT\b|[^()]+?(?=\s*(?:\(|\)|\bAND\b|\bOR\b|\bNOT\b|$)))', re.I)
+
+class _Parser:
+    """
+    Recursive-descent boolean parser. Precedence: NOT > AND > OR; adjacent terms are ANDed.
+    Multi-word names need no quoting: 'Meta Pixel AND NOT Google Analytics'.
+    """
+
+    def __init__(self, expression: str, index: TechIndex):
+        self.tokens = [t.strip() for t in _TOKEN.findall(expression) if t.strip()]
+        self.pos = 0
+        self.index = index
+        self._universe = None
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take(self) -> str:
+        tok = self._peek()
+        self.pos += 1
+        return tok
+
+    def parse(self) -> set[int]:
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token '{self._peek()}' in query")
+        return result
+
+    def _or(self) -> set[int]:
+        result = self._and()
+        while (self._peek() or '').upper() == 'OR':
+            self._take()
+            result = result | self._and()
+        return result
+
+    def _and(self) -> set[int]:
+        result = self._not()
+        while self._peek() is not None and self._peek().upper() != 'OR' and self._peek() != ')':
+            if self._peek().upper() == 'AND':
+                self._take()
+            result = result & self._not()
+        return result
+
+    def _not(self) -> set[int]:
+        if (self._peek() or '').upper() == 'NOT':
+            self._take()
+            if self._universe is None:
+                self._universe = self.index.all_sites()
+            return self._universe - self._not()
+        return self._atom()
+
+    def _atom(self) -> set[int]:
+        tok = self._take()
+        if tok is None:
+            raise ValueError('Query ended unexpectedly')
+        if tok == '(':
+            result = self._or()
+            if self._take() != ')':
+                raise ValueError("Missing ')' in query")
+            return result
+        if tok == ')' or tok.upper() in ('AND', 'OR'):
+            raise ValueError(f"Unexpected '{tok}' in query")
+        return self.index.postings(tok)
+
+def update_from_result(result: dict, timeout: float | None = None) -> None:
+    """Pipeline hook: fold a finished result into the shared index, waiting at most `timeout` for the database."""
+    index = TechIndex(timeout=timeout)
+    try:
+        index.update(result)
+    finally:
+        index.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the technology/tracker inverted index')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    q = sub.add_parser('query', help='Boolean query, e.g. "Shopify AND Meta Pixel AND NOT GA4"')
+    q.add_argument('expression')
+    h = sub.add_parser('history', help='First/last seen times for every site that used a term')
+    h.add_argument('term')
+    sub.add_parser('stats', help='Most common terms and posting list sizes')
+    b = sub.add_parser('build', help='Index every stored result file in a directory')
+    b.add_argument('directory', nargs='?', default=TMP_DIR)
+    args = parser.parse_args()
+
+    index = TechIndex()
+    if args.cmd == 'query':
+        try:
+            print(json.dumps(index.query(args.expression), indent=2))
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+    elif args.cmd == 'history':
+        print(json.dumps(index.history(args.term), indent=2))
+    elif args.cmd == 'stats':
+        print(json.dumps(index.stats(), indent=2))
+    else:
+        import glob
+        sys.path.insert(0, os.path.dirname(__file__))
+        import storage
+        paths = sorted(glob.glob(os.path.join(args.directory, '*_result.*')), key=os.path.getmtime)
+        batch = []
+        for path in paths:
+            try:
+                batch.append(storage.read(path))
+            except Exception:
+                continue
+            if len(batch) >= 1000:
+                index.update_many(batch)
+                batch = []
+        index.update_many(batch)
+        print(json.dumps({'indexed': len(paths), 'path': INDEX_PATH}, indent=2))
+    index.close()
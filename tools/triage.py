@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Tool: triage.py
+Purpose: Header-only triage — probe many domains for server/hosting/CDN/language and queue the interesting ones
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import re
+import ssl
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urljoin
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from detect_tech import detect_infra
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+MATCHES_PATH = os.path.join(TMP_DIR, 'triage_matches.jsonl')
+
+USER_AGENT = 'SiteIntelBot/1.0'
+CONCURRENCY = 500
+PEEK_BYTES = 8 * 1024         # enough for <title> and the generator meta tag
+MAX_HEADER_BYTES = 64 * 1024
+MAX_REDIRECTS = 5
+PROBE_TIMEOUT = 10            # seconds per domain, all hops included
+DNS_WORKERS = 256             # getaddrinfo runs in the loop's thread pool
+
+FIELDS = ('framework', 'cms', 'server', 'hosting', 'cdn', 'language')
+
+_TITLE = re.compile(rb'<title[^>]*>(.*?)</title', re.I | re.S)
+_GENERATOR = re.compile(rb'<meta[^>]+name=["\']generator["\'][^>]+content=["\']([^"\']+)', re.I)
+_GENERATOR_CMS = (('wordpress', 'WordPress'), ('shopify', 'Shopify'), ('wix', 'Wix'),
+                  ('squarespace', 'Squarespace'), ('webflow', 'Webflow'), ('drupal', 'Drupal'))
+
+# ── RAW HTTP/1.1 ─────────────────────────────────────────
+
+def _parse_head(head: bytes) -> tuple[int, dict, list[str]]:
+    """Status code, headers (repeats joined with ', ') and Set-Cookie names."""
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ', 2)
+    if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+        raise ValueError(f'Not an HTTP response: {lines[0][:60]!r}')
+    headers, cookies = {}, []
+    for line in lines[1:]:
+        if ':' not in line:
+            continue
+        name, value = line.split(':', 1)
+        name, value = name.strip().lower(), value.strip()
+        if name == 'set-cookie':
+            cookies.append(value.split('=', 1)[0].strip())
+        headers[name] = f'{headers[name]}, {value}' if name in headers else value
+    return int(parts[1]), headers, cookies
+
+def dechunk(data: bytes) -> bytes:
+    """Best-effort decode of a (possibly cut-off) chunked body prefix."""
+    out, pos = [], 0
+    while pos < len(data):
+        end = data.find(b'\r\n', pos)
+        if end < 0:
+            break
+        try:
+            size = int(data[pos:end].split(b';')[0], 16)
+        except ValueError:
+            break
+        if size == 0:
+            break
+        out.append(data[end + 2:end + 2 + size])
+        pos = end + 2 + size + 2
+    return b''.join(out)
+
+async def _request(url: str, ssl_ctx: ssl.SSLContext, peek: int) -> tuple[int, dict, list[str], bytes]:
+    """One GET that reads the headers and at most `peek` body bytes, then drops the connection."""
+    u = urlparse(url)
+    secure = u.scheme == 'https'
+    port = u.port or (443 if secure else 80)
+    reader, writer = await asyncio.open_connection(
+        u.hostname, port, ssl=ssl_ctx if secure else None,
+        server_hostname=u.hostname if secure else None, limit=MAX_HEADER_BYTES)
+    try:
+        path = (u.path or '/') + (f'?{u.query}' if u.query else '')
+        host = u.hostname if u.port is None else f'{u.hostname}:{u.port}'
+        writer.write((f'GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n'
+                      'Accept: text/html,*/*;q=0.8\r\nAccept-Encoding: identity\r\n'
+                      'Connection: close\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        status, headers, cookies = _parse_head((await reader.readuntil(b'\r\n\r\n'))[:-4])
+
+        body = b''
+        length = headers.get('content-length')
+        want = min(peek, int(length)) if length and length.isdigit() else peek
+        while len(body) < want:
+            chunk = await reader.read(want - len(body))
+            if not chunk:
+                break
+            body += chunk
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = dechunk(body)
+        return status, headers, cookies, body[:peek]
+    finally:
+        writer.close()
+
+async def _follow(url: str, ssl_ctx: ssl.SSLContext, peek: int) -> dict:
+    hops, cookies = [], []
+    for _ in range(MAX_REDIRECTS + 1):
+        status, headers, hop_cookies, body = await _request(url, ssl_ctx, peek)
+        cookies += hop_cookies
+        location = headers.get('location')
+        if status in (301, 302, 303, 307, 308) and location:
+            hops.append(url)
+            url = urljoin(url, location)
+            continue
+        return {'finalUrl': url, 'statusCode': status, 'headers': headers,
+                'cookies': cookies, 'body': body, 'redirects': hops}
+    raise RuntimeError(f'More than {MAX_REDIRECTS} redirects')
+
+# ── CLASSIFICATION ───────────────────────────────────────
+
+def classify(headers: dict, cookies: list[str], body: bytes) -> dict:
+    """Header/cookie rules from detect_tech, plus the <title> and generator tag from the body prefix."""
+    infra = detect_infra(headers, cookies)
+    out = {f: infra[f] or 'Unknown' for f in FIELDS}
+    generator = _GENERATOR.search(body)
+    if generator:
+        gen = generator.group(1).decode('utf-8', 'replace').lower()
+        out['cms'] = next((name for key, name in _GENERATOR_CMS if key in gen), out['cms'])
+    title = _TITLE.search(body)
+    out['title'] = ' '.join(title.group(1).decode('utf-8', 'replace').split())[:200] if title else None
+    return out
+
+async def probe(target: str, ssl_ctx: ssl.SSLContext, peek: int = PEEK_BYTES,
+                timeout: float = PROBE_TIMEOUT) -> dict:
+    """Probe a URL or bare domain (https first, then http). Never raises."""
+    start = time.monotonic()
+    urls = [target] if '://' in target else [f'https://{target}/', f'http://{target}/']
+    error = None
+    for url in urls:
+        try:
+            res = await asyncio.wait_for(_follow(url, ssl_ctx, peek), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, ValueError, RuntimeError) as e:
+            error = f'{type(e).__name__}: {e}' if str(e) else type(e).__name__
+            continue
+        return {
+            'target': target, 'url': res['finalUrl'], 'statusCode': res['statusCode'],
+            'redirects': res['redirects'], **classify(res['headers'], res['cookies'], res['body']),
+            'elapsedMs': int((time.monotonic() - start) * 1000),
+        }
+    return {'target': target, 'error': error, 'elapsedMs': int((time.monotonic() - start) * 1000)}
+
+# ── MATCH CRITERIA ───────────────────────────────────────
+
+def parse_criteria(specs: list[str]) -> dict:
+    """
+    'field=value[,value]' → {field: {values}}. Values match case-insensitively; '*' means
+    any known value. All fields must match; any listed value matches within a field.
+    """
+    criteria = {}
+    for spec in specs or []:
+        field, sep, values = spec.partition('=')
+        field = field.strip()
+        if not sep or field not in FIELDS:
+            raise ValueError(f"Bad --match '{spec}'. Use field=value with field one of: {', '.join(FIELDS)}")
+        criteria.setdefault(field, set()).update(v.strip().lower() for v in values.split(',') if v.strip())
+    return criteria
+
+def matches(result: dict, criteria: dict) -> bool:
+    if 'error' in result or not criteria:
+        return False
+    for field, wanted in criteria.items():
+        value = (result.get(field) or 'Unknown').lower()
+        if '*' in wanted:
+            if value in ('unknown', 'none'):
+                return False
+        elif value not in wanted:
+            return False
+    return True
+
+# ── RUNNER ───────────────────────────────────────────────
+
+def read_targets(path: str):
+    handle = sys.stdin if path == '-' else open(path)
+    with handle:
+        for line in handle:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                yield line
+
+async def triage(targets, out, criteria: dict, matched_out=None, concurrency: int = CONCURRENCY,
+                 peek: int = PEEK_BYTES, timeout: float = PROBE_TIMEOUT) -> dict:
+    """
+    Probe targets with a fixed pool of workers fed from a bounded queue, so memory stays
+    flat no matter how long the input list is. Writes one JSON line per target to `out`
+    and the matching ones to `matched_out`.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=DNS_WORKERS))
+    ssl_ctx = ssl.create_default_context()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {'probed': 0, 'errors': 0, 'matched': 0}
+    start = time.monotonic()
+
+    async def worker():
+        while True:
+            target = await queue.get()
+            if target is None:
+                return
+            result = await probe(target, ssl_ctx, peek, timeout)
+            stats['probed'] += 1
+            if 'error' in result:
+                stats['errors'] += 1
+            out.write(json.dumps(result) + '\n')
+            if matched_out is not None and matches(result, criteria):
+                stats['matched'] += 1
+                matched_out.write(json.dumps(result) + '\n')
+            if stats['probed'] % 1000 == 0:
+                rate = stats['probed'] / (time.monotonic() - start) * 3600
+                print(f"INFO: {stats['probed']} probed ({rate:,.0f}/hour), {stats['matched']} matched", file=sys.stderr)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for target in targets:
+        await queue.put(target)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+    elapsed = time.monotonic() - start
+    stats['elapsedSeconds'] = round(elapsed, 2)
+    stats['perHour'] = int(stats['probed'] / elapsed * 3600) if elapsed else None
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Header-only triage of many domains; queue matches for the full pipeline')
+    parser.add_argument('targets', help="File of domains/URLs, one per line ('-' for stdin)")
+    parser.add_argument('--match', action='append', default=[],
+                        help=f"Criterion field=value[,value] (repeatable; fields: {', '.join(FIELDS)}; '*' = any known)")
+    parser.add_argument('--matches-out', default=MATCHES_PATH, help='JSONL file that receives matching domains')
+    parser.add_argument('--out', help='JSONL file for every probe result (default: stdout)')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--peek', type=int, default=PEEK_BYTES, help='Body bytes to read per page')
+    parser.add_argument('--timeout', type=float, default=PROBE_TIMEOUT, help='Seconds per domain')
+    parser.add_argument('--run', action='store_true', help='Run the full pipeline on each match afterwards')
+    args = parser.parse_args()
+
+    try:
+        criteria = parse_criteria(args.match)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    os.makedirs(TMP_DIR, exist_ok=True)
+    out = open(args.out, 'w') if args.out else sys.stdout
+    matched_out = open(args.matches_out, 'w') if criteria else None
+    try:
+        stats = asyncio.run(triage(read_targets(args.targets), out, criteria, matched_out,
+                                   args.concurrency, args.peek, args.timeout))
+    finally:
+        if args.out:
+            out.close()
+        if matched_out is not None:
+            matched_out.close()
+
+    if criteria:
+        stats['matchesFile'] = args.matches_out
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+
+    if args.run and criteria:
+        from run_pipeline import run_pipeline
+        with open(args.matches_out) as f:
+            for line in f:
+                run_pipeline(json.loads(line)['url'])
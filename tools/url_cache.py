@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tool: url_cache.py
+Purpose: Shared, cross-site URL-keyed cache with TTL (asset sizes, link health, script scans)
+Layer: B.L.A.S.T. Tool Layer
+"""
+
+import sys
+import os
+import json
+import time
+import sqlite3
+import threading
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import storage
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+os.makedirs(TMP_DIR, exist_ok=True)
+
+SQLITE_TIMEOUT = 30  # seconds to wait for another writer
+
+class UrlCache:
+    """
+    A small SQLite-backed key/value store. SQLite gives us safe concurrent access from
+    worker threads and from several pipeline processes sharing the same .tmp directory,
+    which matters because the same CDN assets show up across thousands of sites.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, path: str | None = None, timeout: float | None = None):
+        self.ttl = ttl_seconds
+        self.path = path or os.path.join(TMP_DIR, f"{name}_cache.sqlite")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT if timeout is None else timeout,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, fetched_at REAL)'
+        )
+        self._db.commit()
+
+    def get_entry(self, key: str) -> tuple[object, float] | None:
+        """Return (value, fetched_at) regardless of age, or None if never stored."""
+        with self._lock:
+            row = self._db.execute('SELECT value, fetched_at FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return storage.loads(row[0], 'json'), row[1]
+
+    def get(self, key: str):
+        """Return the cached value if it is younger than the TTL, else None."""
+        entry = self.get_entry(key)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        found, cutoff = {}, time.time() - self.ttl
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ','.join('?' * len(batch))
+                rows = self._db.execute(
+                    f'SELECT key, value FROM entries WHERE fetched_at > ? AND key IN ({marks})',
+                    (cutoff, *batch)
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = storage.loads(value, 'json')
+        return found
+
+    def set(self, key: str, value) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: dict) -> None:
+        now = time.time()
+        rows = [(k, storage.dumps(v, 'json'), now) for k, v in items.items()]
+        with self._lock:
+            self._db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?)', rows)
+            self._db.commit()
+
+    def delete_many(self, keys) -> None:
+        with self._lock:
+            self._db.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k in keys])
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> 'UrlCache':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python url_cache.py <cache_name> <url>")
+        sys.exit(1)
+
+    cache = UrlCache(sys.argv[1], ttl_seconds=float('inf'))
+    entry = cache.get_entry(sys.argv[2])
+    print(json.dumps(None if entry is None else {'value': entry[0], 'fetchedAt': entry[1]}, indent=2))
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Tool: watchlist.py
+Purpose: Watchlist monitoring — per-domain intervals, jitter, global rate limit, change-only re-scans and diffs
+Layer: B.L.A.S.T. Navigation Layer
+"""
+
+import sys
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import contextlib
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import http_fetch
+import storage
+
+TMP_DIR = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+os.makedirs(TMP_DIR, exist_ok=True)
+
+STATE_PATH = os.path.join(TMP_DIR, 'watchlist_state.json')
+CHANGES_PATH = os.path.join(TMP_DIR, 'watchlist_changes.jsonl')
+
+DEFAULT_INTERVAL_HOURS = 24
+JITTER_FRACTION = 0.1        # ±10% so domains added together drift apart
+RATE_PER_MINUTE = 30         # global cap on requests to watched sites
+MAX_WORKERS = 8
+PROBE_TIMEOUT = 10
+MAX_IDLE_SLEEP = 60
+SAVE_EVERY = 50              # persist state every N checks rather than after each one
+DEFAULT_ANALYZERS = ['tech', 'seo', 'competitive']  # diffs don't need the (paid) AI stage
+
+TECH_FIELDS = ('framework', 'cms', 'hosting', 'cdn', 'server', 'language')
+
+# Tokens that change on every request without the page really changing
+_VOLATILE = [
+    re.compile(r'nonce="[^"]*"'),
+    re.compile(r'(?:csrf|token|nonce)[^"\'<>]{0,20}["\']\s*(?:content|value)=["\'][^"\']*["\']', re.I),
+    re.compile(r'\d{6,}'),  # timestamps, cache busters, request ids
+]
+
+class RateLimiter:
+    """Token bucket shared by all worker threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+def load_watchlist(path: str) -> list[dict]:
+    """
+    Accepts a JSON list of {"url", "intervalHours"} objects, or a text file with one
+    `url [intervalHours]` per line (# comments allowed).
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith('.json'):
+        entries = json.loads(text)
+    else:
+        entries = []
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            entry = {'url': parts[0]}
+            if len(parts) > 1:
+                entry['intervalHours'] = float(parts[1])
+            entries.append(entry)
+    for e in entries:
+        e.setdefault('intervalHours', DEFAULT_INTERVAL_HOURS)
+    return entries
+
+def load_state() -> dict:
+    if not os.path.exists(STATE_PATH):
+        return {}
+    return storage.read(STATE_PATH)
+
+def content_hash(html: str) -> str:
+    for pattern in _VOLATILE:
+        html = pattern.sub('', html)
+    return hashlib.sha256(' '.join(html.split()).encode('utf-8', errors='replace')).hexdigest()
+
+def probe(url: str, prev: dict) -> dict:
+    """
+    Cheap change check: conditional GET with the stored validators, then a hash of the
+    normalized body. Returns {'changed': bool, 'reason': str, validators...}.
+    """
+    headers = {}
+    if prev.get('etag'):
+        headers['If-None-Match'] = prev['etag']
+    if prev.get('lastModified'):
+        headers['If-Modified-Since'] = prev['lastModified']
+
+    r = http_fetch.stream_get(url, timeout=PROBE_TIMEOUT, headers=headers, accept=http_fetch.HTML_TYPES)
+    resp_headers = {k.lower(): v for k, v in r['headers'].items()}
+    out = {
+        'etag': resp_headers.get('etag'),
+        'lastModified': resp_headers.get('last-modified'),
+        'contentHash': prev.get('contentHash'),
+    }
+    if r['statusCode'] == 304:
+        out.update(etag=out['etag'] or prev.get('etag'), lastModified=out['lastModified'] or prev.get('lastModified'))
+        return dict(out, changed=False, reason='304 Not Modified')
+
+    # A strong ETag that matches means the same bytes, even if the server ignored If-None-Match
+    etag = out['etag']
+    if etag and not etag.startswith('W/') and etag == prev.get('etag') and prev.get('snapshot'):
+        return dict(out, changed=False, reason='ETag unchanged')
+
+    out['contentHash'] = content_hash(r['text'])
+    if prev.get('snapshot') is None:
+        return dict(out, changed=True, reason='first scan')
+    if out['contentHash'] == prev.get('contentHash'):
+        return dict(out, changed=False, reason='content hash unchanged')
+    return dict(out, changed=True, reason='content changed')
+
+def snapshot(result: dict) -> dict:
+    tech = result.get('techStack') or {}
+    comp = result.get('competitive') or {}
+    seo = result.get('seo') or {}
+    return {
+        'techStack': {f: tech.get(f) for f in TECH_FIELDS} | {'libraries': tech.get('libraries', [])},
+        'adNetworks': comp.get('adNetworks', []),
+        'trackingPixels': comp.get('trackingPixels', []),
+        'seoScore': seo.get('score'),
+    }
+
+def _list_diff(old: list, new: list) -> dict | None:
+    added = [x for x in new if x not in old]
+    removed = [x for x in old if x not in new]
+    return {'added': added, 'removed': removed} if added or removed else None
+
+def diff(old: dict, new: dict) -> dict:
+    """Changes in tech stack, ad networks, trackers and SEO score between two snapshots."""
+    changes = {}
+    tech = {f: {'from': old['techStack'].get(f), 'to': new['techStack'].get(f)}
+            for f in TECH_FIELDS if old['techStack'].get(f) != new['techStack'].get(f)}
+    libs = _list_diff(old['techStack'].get('libraries', []), new['techStack'].get('libraries', []))
+    if libs:
+        tech['libraries'] = libs
+    if tech:
+        changes['techStack'] = tech
+    for key in ('adNetworks', 'trackingPixels'):
+        d = _list_diff(old.get(key, []), new.get(key, []))
+        if d:
+            changes[key] = d
+    if old.get('seoScore') != new.get('seoScore'):
+        before, after = old.get('seoScore'), new.get('seoScore')
+        changes['seoScore'] = {'from': before, 'to': after,
+                               'delta': (after - before) if None not in (before, after) else None}
+    return changes
+
+class Watcher:
+    def __init__(self, entries: list[dict], only: list[str] | None = None,
+                 rate_per_minute: float = RATE_PER_MINUTE, workers: int = MAX_WORKERS, quiet: bool = True):
+        self.entries = entries
+        self.only = only or DEFAULT_ANALYZERS
+        self.limiter = RateLimiter(rate_per_minute)
+        self.workers = workers
+        self.quiet = quiet
+        self.state = load_state()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+    def due(self, now: float) -> list[dict]:
+        due = [e for e in self.entries if self.state.get(e['url'], {}).get('nextDue', 0) <= now]
+        return sorted(due, key=lambda e: self.state.get(e['url'], {}).get('nextDue', 0))
+
+    def next_wakeup(self) -> float:
+        return min((self.state.get(e['url'], {}).get('nextDue', 0) for e in self.entries), default=time.time())
+
+    def _schedule(self, entry: dict) -> float:
+        interval = entry['intervalHours'] * 3600
+        return time.time() + interval * (1 + random.uniform(-JITTER_FRACTION, JITTER_FRACTION))
+
+    def _save(self) -> None:
+        storage.write(STATE_PATH, self.state)
+        self._unsaved = 0
+
+    def _emit(self, record: dict) -> None:
+        with open(CHANGES_PATH, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def check(self, entry: dict) -> dict:
+        url = entry['url']
+        with self._lock:
+            prev = dict(self.state.get(url, {}))
+        now_iso = datetime.now(timezone.utc).isoformat()
+        outcome = {'url': url, 'checkedAt': now_iso}
+
+        try:
+            self.limiter.acquire()
+            p = probe(url, prev)
+        except Exception as e:
+            outcome.update(status='error', error=f'probe failed: {e}')
+            p = None
+
+        new_state = dict(prev, lastChecked=now_iso, nextDue=self._schedule(entry))
+        if p is not None:
+            new_state.update(etag=p['etag'], lastModified=p['lastModified'], contentHash=p['contentHash'])
+            outcome['reason'] = p['reason']
+            if not p['changed']:
+                outcome['status'] = 'unchanged'
+            else:
+                outcome.update(self._rescan(url, prev, new_state, now_iso))
+
+        with self._lock:
+            self.state[url] = new_state
+            self._unsaved += 1
+            if self._unsaved >= SAVE_EVERY:
+                self._save()
+        return outcome
+
+    def _rescan(self, url: str, prev: dict, new_state: dict, now_iso: str) -> dict:
+        import run_pipeline
+
+        # On failure keep the old validators so the change is picked up again next time
+        keep_old = {k: prev.get(k) for k in ('etag', 'lastModified', 'contentHash')}
+        self.limiter.acquire()
+        try:
+            # The page changed, so a near-duplicate representative's analysis is stale for it
+            result = run_pipeline.run_pipeline(url, only=self.only, refresh=True, dedupe=False)
+        except Exception as e:
+            new_state.update(keep_old)
+            return {'status': 'error', 'error': f'pipeline failed: {e}'}
+
+        if result.get('status') != 'done':
+            new_state.update(keep_old)
+            return {'status': 'error', 'error': result.get('error'), 'resultId': result.get('id')}
+
+        snap = snapshot(result)
+        changes = diff(prev['snapshot'], snap) if prev.get('snapshot') else {}
+        new_state.update(snapshot=snap, lastResultId=result['id'])
+        if prev.get('snapshot') is None:
+            status = 'baseline'
+        elif changes:
+            status = 'changed'
+            new_state['lastChanged'] = now_iso
+            self._emit({'url': url, 'detectedAt': now_iso, 'resultId': result['id'], 'changes': changes})
+        else:
+            status = 'rescanned'  # page content changed but nothing we track did
+        return {'status': status, 'resultId': result['id'], 'changes': changes}
+
+    def run_once(self) -> list[dict]:
+        batch = self.due(time.time())
+        if not batch:
+            return []
+        # stdout is process-wide, so silence the pipeline's progress output once for the whole batch
+        with open(os.devnull, 'w') as sink, \
+                (contextlib.redirect_stdout(sink) if self.quiet else contextlib.nullcontext()):
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    return list(pool.map(self.check, batch))
+            finally:
+                with self._lock:
+                    self._save()
+
+    def run_forever(self) -> None:
+        while True:
+            for outcome in self.run_once():
+                _report(outcome)
+            time.sleep(max(1, min(MAX_IDLE_SLEEP, self.next_wakeup() - time.time())))
+
+def _report(outcome: dict) -> None:
+    line = f"{outcome.get('status', '?'):>10}  {outcome['url']}"
+    if outcome.get('reason'):
+        line += f"  ({outcome['reason']})"
+    if outcome.get('error'):
+        line += f"  ⚠️  {outcome['error']}"
+    for key, change in (outcome.get('changes') or {}).items():
+        line += f"\n            ↳ {key}: {json.dumps(change)}"
+    print(line)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Monitor a watchlist of sites and re-analyze only those that changed')
+    parser.add_argument('watchlist', help='JSON list of {url, intervalHours} or text file of "url [hours]" lines')
+    parser.add_argument('--loop', action='store_true', help='Keep running and re-check domains as they become due')
+    parser.add_argument('--rate', type=float, default=RATE_PER_MINUTE, help='Global requests per minute')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--only', help=f"Analyzers to run on changed sites (default: {','.join(DEFAULT_ANALYZERS)})")
+    parser.add_argument('--verbose', action='store_true', help='Show full pipeline output for re-scans')
+    args = parser.parse_args()
+
+    import analyzers
+    try:
+        only = analyzers.parse_selection(args.only) or None
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    watcher = Watcher(load_watchlist(args.watchlist), only=only, rate_per_minute=args.rate,
+                      workers=args.workers, quiet=not args.verbose)
+    if args.loop:
+        watcher.run_forever()
+    else:
+        outcomes = watcher.run_once()
+        for outcome in outcomes:
+            _report(outcome)
+        print(f"\n{len(outcomes)} checked | "
+              f"{sum(1 for o in outcomes if o.get('status') in ('changed', 'rescanned', 'baseline'))} re-scanned | "
+              f"{sum(1 for o in outcomes if o.get('status') == 'changed')} changed")